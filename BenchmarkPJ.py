@@ -0,0 +1,559 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script: BenchmarkPJ.py
+Descrição: Benchmarks do pipeline de importação de UC PJ (CriaePopulaSQLitePJ).
+           carga: compara linhas/segundo dos motores de gravação (to_sql x executemany)
+                  e confere se o schema gerado é idêntico.
+           datas: parse_date linha a linha x converte_datas (valores distintos) num chunk BT.
+           leitura: leitura+conversão por chunk com inferência do pandas x leitura tipada pelo DDA
+                    (tempo por chunk, linhas/s e pico de RSS, cada caso em processo próprio).
+           motores: parser pandas x PyArrow na leitura da importação e na amostra do DDA (Compara3PJ).
+           indices: tempo de criação dos índices de INDEX_SPEC e consultas antes/depois numa base importada.
+           raios: consultas por raio (1, 10 e 100 km) via R*Tree x varredura completa (haversine em todas as UCs).
+           gc: conversão coluna a coluna + gc.collect() por chunk x conversão em bloco + GC_INTERVAL
+               (tempo de conversão e tempo em GC medido por gc.callbacks).
+           suite: inferência do DDA, importação completa e consultas fixas sobre dados sintéticos
+                  (GeraDadosSinteticosPJ) de vários tamanhos; grava tempo, linhas/s, pico de RSS e
+                  tamanho da base num JSON.
+           compara: compara dois JSON da suíte e aponta regressões acima de um limite (%).
+Data: 2026-10-15
+Programador: Ivo Cyrillo
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from sqlalchemy import create_engine
+
+import Compara3PJ as c3
+import ConsultasEspaciaisPJ as ce
+import CriaePopulaSQLitePJ as cp
+import GeraDadosSinteticosPJ as gs
+
+TIPOS = ("at", "mt", "bt")
+
+
+def schema_sql(db_path: Path, table: str) -> str:
+    """Retorna o DDL da tabela conforme gravado em sqlite_master."""
+    con = sqlite3.connect(db_path)
+    try:
+        row = con.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()
+        return row[0] if row else None
+    finally:
+        con.close()
+
+
+def bench_carga(tipos, motores=("to_sql", "executemany")):
+    """Importa cada tipo com cada motor de gravação em base temporária e mede linhas/s."""
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for tp in tipos:
+            schemas = {}
+            for motor in motores:
+                db_path = Path(tmp) / f"bench_{tp}_{motor}.db"
+                engine = create_engine(f"sqlite:///{db_path}")
+                cp.LOAD_ENGINE = motor
+                t0 = time.perf_counter()
+                linhas = cp.importa_tipo(tp, engine)
+                dt = time.perf_counter() - t0
+                engine.dispose()
+                schemas[motor] = schema_sql(db_path, f"uc_{tp}_pj")
+                resultados.append((tp, motor, linhas, dt, linhas / dt if dt else 0.0))
+            iguais = len(set(schemas.values())) == 1
+            print(f"Schema uc_{tp}_pj idêntico entre motores: {'sim' if iguais else 'NÃO'}\n")
+
+    print(f"{'tipo':<4} {'motor':<12} {'linhas':>12} {'tempo (s)':>10} {'linhas/s':>12}")
+    for tp, motor, linhas, dt, lps in resultados:
+        print(f"{tp:<4} {motor:<12} {linhas:>12} {dt:>10.2f} {lps:>12.0f}")
+    return resultados
+
+
+def le_coluna_bt(cols, nrows: int) -> pd.DataFrame:
+    """Lê as primeiras nrows linhas do BT (ZIP) apenas com as colunas pedidas, como texto."""
+    with zipfile.ZipFile(cp.FILES["bt"]) as z:
+        csv_name = next(f for f in z.namelist() if f.lower().endswith(".csv"))
+        with z.open(csv_name) as f:
+            return pd.read_csv(f, sep=cp.SEP, encoding=cp.ENCODING, usecols=cols,
+                               dtype=str, nrows=nrows)
+
+
+def bench_datas(nrows: int = 1_000_000):
+    """Compara Series.apply(parse_date) com converte_datas num chunk BT de nrows linhas."""
+    df = le_coluna_bt(cp.DATE_FIELDS, nrows)
+    print(f"Chunk BT: {len(df)} linhas, colunas {cp.DATE_FIELDS}")
+    print(f"{'coluna':<12} {'distintos':>10} {'apply (s)':>10} {'vetorizado (s)':>15} {'ganho':>7}")
+    for col in cp.DATE_FIELDS:
+        t0 = time.perf_counter()
+        antes = df[col].apply(cp.parse_date)
+        t_apply = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        depois = cp.converte_datas(df[col])
+        t_vet = time.perf_counter() - t0
+        assert antes.astype(object).where(antes.notna(), None).equals(depois), f"resultado divergente em {col}"
+        print(f"{col:<12} {df[col].nunique():>10} {t_apply:>10.3f} {t_vet:>15.3f} {t_apply / t_vet:>6.0f}x")
+
+
+def mede_leitura(tp: str, tipada: bool, motor: str = "pandas") -> dict:
+    """Lê e converte todos os chunks de um tipo (sem gravar) medindo tempo por chunk."""
+    cp.TYPED_READ = tipada
+    cp.CSV_ENGINE = motor
+    tipo_map = cp.load_dda(tp)
+    tempos, linhas = [], 0
+    t0 = time.perf_counter()
+    for chunk in cp.chunks_convertidos(tp, tipo_map):
+        t1 = time.perf_counter()
+        tempos.append(t1 - t0)
+        linhas += len(chunk)
+        del chunk
+        t0 = time.perf_counter()
+    total = sum(tempos)
+    return {"chunks": len(tempos), "linhas": linhas, "ms_chunk": 1000 * total / max(len(tempos), 1),
+            "linhas_s": linhas / total if total else 0.0, "rss_mb": cp.pico_rss_mb()}
+
+
+def bench_leitura(tipos):
+    """Compara leitura com inferência + to_numeric x leitura tipada, cada uma em processo novo."""
+    print(f"{'tipo':<4} {'leitura':<9} {'chunks':>7} {'ms/chunk':>9} {'linhas/s':>10} {'pico RSS (MB)':>14}")
+    for tp in tipos:
+        for tipada in (False, True):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                r = pool.submit(mede_leitura, tp, tipada).result()
+            rss = f"{r['rss_mb']:.0f}" if r["rss_mb"] is not None else "-"
+            print(f"{tp:<4} {'tipada' if tipada else 'inferida':<9} {r['chunks']:>7} "
+                  f"{r['ms_chunk']:>9.1f} {r['linhas_s']:>10.0f} {rss:>14}")
+
+
+def mede_amostra_dda(tp: str, motor: str) -> float:
+    """Tempo de leitura das 10k linhas usadas pelo Compara3PJ para inferir o DDA."""
+    c3.CSV_ENGINE = motor
+    t0 = time.perf_counter()
+    if motor == "pyarrow":
+        c3.read_head_arrow(tp, c3.FILES[tp], 10000)
+    elif tp in ("at", "mt"):
+        pd.read_csv(c3.FILES[tp], sep=c3.SEP, decimal=c3.DECIMAL, encoding=c3.ENCODING,
+                    nrows=10000, low_memory=False)
+    else:
+        with zipfile.ZipFile(c3.FILES[tp]) as z:
+            csv_name = next(f for f in z.namelist() if f.lower().endswith(".csv"))
+            with z.open(csv_name) as f:
+                pd.read_csv(f, sep=c3.SEP, decimal=c3.DECIMAL, encoding=c3.ENCODING,
+                            nrows=10000, low_memory=False)
+    return time.perf_counter() - t0
+
+
+def bench_motores(tipos, motores=("pandas", "pyarrow")):
+    """Tabela pandas x PyArrow: leitura completa tipada (importação) e amostra do DDA."""
+    print(f"{'tipo':<4} {'motor':<8} {'linhas':>10} {'leitura (s)':>12} {'linhas/s':>10} "
+          f"{'pico RSS (MB)':>14} {'amostra DDA (s)':>16}")
+    for tp in tipos:
+        for motor in motores:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                r = pool.submit(mede_leitura, tp, True, motor).result()
+                t_dda = pool.submit(mede_amostra_dda, tp, motor).result()
+            t_total = r["linhas"] / r["linhas_s"] if r["linhas_s"] else 0.0
+            rss = f"{r['rss_mb']:.0f}" if r["rss_mb"] is not None else "-"
+            print(f"{tp:<4} {motor:<8} {r['linhas']:>10} {t_total:>12.2f} {r['linhas_s']:>10.0f} "
+                  f"{rss:>14} {t_dda:>16.3f}")
+
+
+# (nome, SQL com {t} = tabela, coluna de onde sai o parâmetro)
+CONSULTAS_INDICE = [
+    ("UC por COD_ID", 'SELECT * FROM "{t}" WHERE "COD_ID" = ?', "COD_ID"),
+    ("UCs por município", 'SELECT COUNT(*) FROM "{t}" WHERE "MUN" = ?', "MUN"),
+    ("UCs por subestação", 'SELECT COUNT(*) FROM "{t}" WHERE "SUB" = ?', "SUB"),
+    ("alimentador x grupo tarifário",
+     'SELECT "GRU_TAR", COUNT(*) FROM "{t}" WHERE "CTMT" = ? GROUP BY "GRU_TAR"', "CTMT"),
+]
+
+
+def valor_exemplo(con, table: str, col: str):
+    """Valor não nulo do meio da tabela, usado como parâmetro das consultas."""
+    n = con.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    row = con.execute(f'SELECT "{col}" FROM "{table}" WHERE "{col}" IS NOT NULL LIMIT 1 OFFSET ?',
+                      (n // 2,)).fetchone()
+    return row[0] if row else None
+
+
+def tempo_consultas(con, table: str, repeticoes: int) -> dict:
+    """ms médio de cada consulta de CONSULTAS_INDICE (ignora as de colunas ausentes)."""
+    cols = {r[1] for r in con.execute(f'PRAGMA table_info("{table}")')}
+    tempos = {}
+    for nome, sql, col in CONSULTAS_INDICE:
+        if col not in cols:
+            continue
+        param = valor_exemplo(con, table, col)
+        q = sql.format(t=table)
+        t0 = time.perf_counter()
+        for _ in range(repeticoes):
+            con.execute(q, (param,)).fetchall()
+        tempos[nome] = 1000 * (time.perf_counter() - t0) / repeticoes
+    return tempos
+
+
+def bench_indices(tipos, db_path: Path = None, repeticoes: int = 20):
+    """Remove os índices de INDEX_SPEC, mede as consultas, recria (medindo) e mede de novo."""
+    db_path = db_path or cp.DB_PATH
+    engine = create_engine(f"sqlite:///{db_path}")
+    con = sqlite3.connect(db_path)
+    linhas = []
+    for tp in tipos:
+        table = f"uc_{tp}_pj"
+        spec = {table: cp.INDEX_SPEC.get(table, [])}
+        for ix in spec[table]:
+            con.execute(f'DROP INDEX IF EXISTS "{cp.nome_indice(table, ix)}"')
+        antes = tempo_consultas(con, table, repeticoes)
+        t_idx = sum(dt for _, _, dt in cp.cria_indices(engine, spec))
+        con.execute("ANALYZE")
+        depois = tempo_consultas(con, table, repeticoes)
+        print(f"{table}: índices criados em {t_idx:.2f}s")
+        for nome in antes:
+            linhas.append((tp, nome, antes[nome], depois[nome]))
+    con.close()
+    engine.dispose()
+    print(f"\n{'tipo':<4} {'consulta':<30} {'antes (ms)':>11} {'depois (ms)':>12} {'ganho':>8}")
+    for tp, nome, a, d in linhas:
+        print(f"{tp:<4} {nome:<30} {a:>11.2f} {d:>12.2f} {a / d if d else 0:>7.0f}x")
+    return linhas
+
+
+def coordenadas_uc(con, tp: str):
+    """(COD_ID, x, y) em arrays das UCs com coordenada válida (mesmo filtro da R*Tree)."""
+    df = pd.read_sql_query(f'SELECT "COD_ID", "POINT_X", "POINT_Y" FROM "uc_{tp}_pj" '
+                           f'WHERE "POINT_X" IS NOT NULL AND "POINT_Y" IS NOT NULL '
+                           f'AND NOT ("POINT_X" = 0 AND "POINT_Y" = 0)', con)
+    return df["COD_ID"].to_numpy(), df["POINT_X"].to_numpy(float), df["POINT_Y"].to_numpy(float)
+
+
+def raio_por_varredura(coords, lon: float, lat: float, raio_km: float) -> set:
+    """Referência independente de ce.uc_no_raio: haversine em todas as UCs, sem retângulo nem índice."""
+    cod, x, y = coords
+    la1, la2 = np.radians(lat), np.radians(y)
+    a = np.sin((la2 - la1) / 2) ** 2 + np.cos(la1) * np.cos(la2) * np.sin(np.radians(x - lon) / 2) ** 2
+    return set(cod[2 * ce.RAIO_TERRA_KM * np.arcsin(np.sqrt(a)) <= raio_km])
+
+
+def bench_raios(tipos, db_path: Path = None, raios=(1, 10, 100), pontos: int = 20):
+    """ms médio por consulta de raio (centros = UCs sorteadas) com R*Tree e com varredura completa
+    (haversine vetorizado sobre as coordenadas já em memória); diverg. conta UCs que só um dos
+    dois devolveu, e deve ser 0."""
+    con = sqlite3.connect(db_path or cp.DB_PATH)
+    print(f"{'tipo':<4} {'raio (km)':>9} {'UCs/consulta':>13} {'R*Tree (ms)':>12} {'varredura (ms)':>15} "
+          f"{'ganho':>7} {'diverg.':>8}")
+    for tp in tipos:
+        centros = con.execute(f'SELECT x, y FROM "uc_{tp}_pj_rtree" ORDER BY random() LIMIT ?',
+                              (pontos,)).fetchall()
+        if not centros:
+            print(f"{tp:<4} sem R*Tree (importe com SPATIAL_INDEX = True)")
+            continue
+        coords = coordenadas_uc(con, tp)
+        for raio in raios:
+            t0 = time.perf_counter()
+            via_rtree = [{r[0] for r in ce.uc_no_raio(con, tp, x, y, raio)} for x, y in centros]
+            t_rt = 1000 * (time.perf_counter() - t0) / len(centros)
+            t0 = time.perf_counter()
+            via_scan = [raio_por_varredura(coords, x, y, raio) for x, y in centros]
+            t_scan = 1000 * (time.perf_counter() - t0) / len(centros)
+            n = sum(len(r) for r in via_rtree)
+            diverg = sum(len(a ^ b) for a, b in zip(via_rtree, via_scan))
+            print(f"{tp:<4} {raio:>9} {n / len(centros):>13.0f} {t_rt:>12.2f} {t_scan:>15.2f} "
+                  f"{t_scan / t_rt if t_rt else 0:>6.0f}x {diverg:>8}")
+    con.close()
+
+
+def converte_chunk_colunas(chunk: pd.DataFrame, tipo_map: dict) -> pd.DataFrame:
+    """Conversão anterior do importador (referência): reatribui coluna a coluna."""
+    for col, t in tipo_map.items():
+        if t in ("REAL", "INTEGER"):
+            if pd.api.types.is_numeric_dtype(chunk[col]):
+                chunk[col] = chunk[col].fillna(0)
+            else:
+                chunk[col] = pd.to_numeric(chunk[col], errors="coerce").fillna(0)
+        elif col in cp.DATE_FIELDS:
+            chunk[col] = cp.converte_datas(chunk[col])
+        elif not isinstance(chunk[col].dtype, pd.StringDtype):
+            chunk[col] = chunk[col].where(chunk[col].notna(), None)
+    return chunk
+
+
+def mede_gc(tp: str, legado: bool, tipada: bool) -> dict:
+    """Lê e converte todos os chunks de um tipo; tempo de conversão e tempo gasto em GC."""
+    tipo_map = cp.load_dda(tp)
+    dtype = cp.read_dtypes(tipo_map) if tipada else None
+    em_gc, inicio = [0.0], [0.0]
+
+    def cronometro(fase, info):
+        if fase == "start":
+            inicio[0] = time.perf_counter()
+        else:
+            em_gc[0] += time.perf_counter() - inicio[0]
+
+    gc.callbacks.append(cronometro)
+    t_conv, chunks = 0.0, 0
+    t0 = time.perf_counter()
+    try:
+        for chunk in cp.read_data_chunk(tp, cp.FILES[tp], cp.CHUNKSIZE, dtype=dtype):
+            t1 = time.perf_counter()
+            chunk = converte_chunk_colunas(chunk, tipo_map) if legado else cp.converte_chunk(chunk, tipo_map)
+            t_conv += time.perf_counter() - t1
+            chunks += 1
+            del chunk
+            # como no importa_tipo: antes a cada chunk, agora a cada GC_INTERVAL
+            if legado or (cp.GC_INTERVAL and chunks % cp.GC_INTERVAL == 0):
+                gc.collect()
+    finally:
+        gc.callbacks.remove(cronometro)
+    return {"chunks": chunks, "total": time.perf_counter() - t0, "conversao": t_conv, "gc": em_gc[0]}
+
+
+def bench_gc(tipos):
+    """Conversão coluna a coluna + gc.collect() por chunk x conversão em bloco + GC_INTERVAL,
+    com leitura inferida e tipada; antes confere que as duas conversões dão o mesmo resultado."""
+    for tp in tipos:
+        tipo_map = cp.load_dda(tp)
+        for dtype in (None, cp.read_dtypes(tipo_map)):
+            chunk = next(iter(cp.read_data_chunk(tp, cp.FILES[tp], cp.CHUNKSIZE, dtype=dtype)))
+            pd.testing.assert_frame_equal(converte_chunk_colunas(chunk.copy(), tipo_map),
+                                          cp.converte_chunk(chunk, tipo_map))
+    print(f"{'tipo':<4} {'leitura':<9} {'conversão':<10} {'chunks':>7} {'total (s)':>10} "
+          f"{'conversão (s)':>14} {'GC (s)':>8}")
+    for tp in tipos:
+        for tipada in (False, True):
+            for legado in (True, False):
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    r = pool.submit(mede_gc, tp, legado, tipada).result()
+                print(f"{tp:<4} {'tipada' if tipada else 'inferida':<9} {'colunas' if legado else 'bloco':<10} "
+                      f"{r['chunks']:>7} {r['total']:>10.2f} {r['conversao']:>14.2f} {r['gc']:>8.2f}")
+
+# Consultas analíticas fixas da suíte (colunas presentes nos extratos reais e nos sintéticos)
+CONSULTAS_SUITE = {
+    "energia_anual_por_mun_bt": 'SELECT MUN, SUM(' + ' + '.join(f"ENE_{m:02d}" for m in range(1, 13))
+                                + ') FROM uc_bt_pj GROUP BY MUN',
+    "uc_por_ctmt_gru_tar_mt": 'SELECT CTMT, GRU_TAR, COUNT(*) FROM uc_mt_pj GROUP BY CTMT, GRU_TAR',
+    "dic_medio_por_ctmt_bt": 'SELECT CTMT, AVG(DIC_01) FROM uc_bt_pj GROUP BY CTMT',
+    "gd_por_distribuidora_bt": 'SELECT DIST, COUNT(*) FROM uc_bt_pj WHERE CEG_GD IS NOT NULL GROUP BY DIST',
+    "top10_ctmt_energia_at": 'SELECT CTMT, SUM(ENE_12) e FROM uc_at_pj GROUP BY CTMT ORDER BY e DESC LIMIT 10',
+    "uc_por_cod_id_bt": 'SELECT * FROM uc_bt_pj WHERE COD_ID = ?',
+}
+
+
+def linhas_suite(tamanho: int) -> dict:
+    """Linhas por tipo para um tamanho da suíte (tamanho = linhas de BT)."""
+    return {"at": max(tamanho // 100, 100), "mt": max(tamanho // 10, 100), "bt": tamanho}
+
+
+def configura_pasta(pasta: Path):
+    """Aponta entradas, DDA e base dos dois scripts para a pasta de dados da suíte."""
+    c3.INPUT_DIR = c3.OUTPUT_DIR = pasta
+    c3.FILES = {tp: pasta / f.name for tp, f in c3.FILES.items()}
+    c3.USE_CACHE = False
+    cp.INPUT_DIR = cp.DDA_DIR = cp.OUTPUT_DIR = pasta
+    cp.FILES = dict(c3.FILES)
+    cp.DDA_FILES = {tp: pasta / f.name for tp, f in cp.DDA_FILES.items()}
+    cp.DB_PATH = pasta / cp.DB_NAME
+    cp.TIMINGS_PATH = pasta / cp.TIMINGS_PATH.name
+
+
+def suite_inferencia(pasta: str) -> dict:
+    """Gera os DDA dos três tipos (processo próprio: o pico de RSS é só desta etapa)."""
+    configura_pasta(Path(pasta))
+    t0 = time.perf_counter()
+    for tp, path in c3.FILES.items():
+        c3.processar_tipo(tp, path)
+    return {"tempo_s": time.perf_counter() - t0, "pico_rss_mb": cp.pico_rss_mb()}
+
+
+def suite_importacao(pasta: str) -> dict:
+    """Carga completa do zero, como o __main__ do CriaePopulaSQLitePJ."""
+    configura_pasta(Path(pasta))
+    if cp.DB_PATH.exists():
+        cp.DB_PATH.unlink()
+    engine = create_engine(f"sqlite:///{cp.DB_PATH}")
+    tempos = cp.importa(engine)
+    engine.dispose()
+    return {"tempo_s": tempos["total"], "pico_rss_mb": cp.pico_rss_mb(),
+            "db_mb": cp.DB_PATH.stat().st_size / 2**20, "etapas_s": tempos}
+
+
+def suite_consultas(pasta: str, repeticoes: int) -> dict:
+    """Mediana de repeticoes execuções de cada consulta de CONSULTAS_SUITE."""
+    configura_pasta(Path(pasta))
+    con = sqlite3.connect(cp.DB_PATH)
+    cod = con.execute("SELECT COD_ID FROM uc_bt_pj LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM uc_bt_pj)").fetchone()
+    tempos = {}
+    for nome, sql in CONSULTAS_SUITE.items():
+        args = cod if "?" in sql else ()
+        medidas = []
+        for _ in range(repeticoes):
+            t0 = time.perf_counter()
+            con.execute(sql, args).fetchall()
+            medidas.append(time.perf_counter() - t0)
+        tempos[nome] = sorted(medidas)[len(medidas) // 2]
+    con.close()
+    return {"tempo_s": sum(tempos.values()), "pico_rss_mb": cp.pico_rss_mb(), "consultas_s": tempos}
+
+
+def em_processo(func, *args) -> dict:
+    """Roda a etapa num processo novo (spawn), isolando o pico de memória."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(func, *args).result()
+
+
+def config_suite() -> dict:
+    """Configurações que mudam os números (gravadas no resultado para comparar runs)."""
+    return {"python": platform.python_version(), "pandas": pd.__version__, "plataforma": platform.platform(),
+            "INFERENCE_MODE": c3.INFERENCE_MODE, "CSV_ENGINE": cp.CSV_ENGINE, "LOAD_ENGINE": cp.LOAD_ENGINE,
+            "IMPORT_MODE": cp.IMPORT_MODE, "CHUNKSIZE": cp.CHUNKSIZE, "TYPED_READ": cp.TYPED_READ,
+            "PARALLEL_SHARDS": cp.PARALLEL_SHARDS, "BUILD_INDEXES": cp.BUILD_INDEXES}
+
+
+def bench_suite(tamanhos, saida: Path, dados: Path = None, rotulo: str = "", repeticoes: int = 5) -> dict:
+    """Para cada tamanho: gera os dados sintéticos (ou reaproveita os de dados/), infere o DDA,
+    importa e roda as consultas fixas; grava tempo, linhas/s, pico de RSS e tamanho da base em saida."""
+    resultado = {"rotulo": rotulo, "data": time.strftime("%Y-%m-%dT%H:%M:%S"), "config": config_suite(),
+                 "medidas": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for tamanho in tamanhos:
+            linhas = linhas_suite(tamanho)
+            pasta = (dados or Path(tmp)) / f"n{tamanho}"
+            if not all((pasta / c3.FILES[tp].name).exists() for tp in linhas):
+                gs.gera(linhas, pasta)  # semente fixa: mesmos dados em toda execução
+            total = sum(linhas.values())
+            for etapa, func, args in (("inferencia", suite_inferencia, (str(pasta),)),
+                                      ("importacao", suite_importacao, (str(pasta),)),
+                                      ("consultas", suite_consultas, (str(pasta), repeticoes))):
+                r = em_processo(func, *args)
+                r.update(tamanho=tamanho, etapa=etapa, linhas=total)
+                if etapa != "consultas":
+                    r["linhas_s"] = total / r["tempo_s"] if r["tempo_s"] else 0.0
+                resultado["medidas"].append(r)
+                print(f"n={tamanho:<10} {etapa:<11} {r['tempo_s']:>9.2f}s"
+                      + (f" {r['linhas_s']:>12,.0f} linhas/s" if "linhas_s" in r else " " * 21)
+                      + f"  RSS {r['pico_rss_mb'] or 0:>7.0f} MB"
+                      + (f"  base {r['db_mb']:.1f} MB" if "db_mb" in r else ""))
+            if dados is None:
+                shutil.rmtree(pasta, ignore_errors=True)
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(resultado, indent=2), encoding="utf-8")
+    print(f"Resultados em {saida}")
+    return resultado
+
+
+def medidas_comparaveis(resultado: dict) -> dict:
+    """(tamanho, medida) → valor: tempo e pico de RSS por etapa, tempo por consulta e tamanho da base."""
+    out = {}
+    for m in resultado["medidas"]:
+        n, etapa = m["tamanho"], m["etapa"]
+        out[(n, f"{etapa}.tempo_s")] = m["tempo_s"]
+        if m.get("pico_rss_mb") is not None:
+            out[(n, f"{etapa}.pico_rss_mb")] = m["pico_rss_mb"]
+        if "db_mb" in m:
+            out[(n, "importacao.db_mb")] = m["db_mb"]
+        for nome, dt in m.get("consultas_s", {}).items():
+            out[(n, f"consulta.{nome}")] = dt
+    return out
+
+
+# variação absoluta abaixo disso é ruído (consultas de microssegundos, RSS do interpretador)
+PISO_TEMPO_S = 0.005
+PISO_MB = 5.0
+
+
+def compara_resultados(base: Path, novo: Path, limite_pct: float = 10.0) -> list:
+    """Compara dois resultados da suíte; marca REGRESSÃO onde o novo piora mais que limite_pct
+    e mais que o piso absoluto (tempo, memória e tamanho da base: maior é pior). Devolve as regressões."""
+    a = json.loads(base.read_text(encoding="utf-8"))
+    b = json.loads(novo.read_text(encoding="utf-8"))
+    ma, mb = medidas_comparaveis(a), medidas_comparaveis(b)
+    print(f"base: {a['rotulo'] or base.name} ({a['data']})   novo: {b['rotulo'] or novo.name} ({b['data']})")
+    difs = {k: v for k, v in b["config"].items() if a["config"].get(k) != v}
+    if difs:
+        print(f"[AVISO] configurações diferentes: {difs}")
+    print(f"{'tamanho':>10} {'medida':<42} {'base':>10} {'novo':>10} {'var %':>8}")
+    regressoes = []
+    for chave in sorted(set(ma) & set(mb)):
+        va, vb = ma[chave], mb[chave]
+        var = 100 * (vb - va) / va if va else 0.0
+        piso = PISO_MB if chave[1].endswith("_mb") else PISO_TEMPO_S
+        marca = ""
+        if abs(vb - va) < piso:
+            pass
+        elif var > limite_pct:
+            marca = "  REGRESSÃO"
+            regressoes.append((chave, va, vb, var))
+        elif var < -limite_pct:
+            marca = "  melhora"
+        print(f"{chave[0]:>10} {chave[1]:<42} {va:>10.3f} {vb:>10.3f} {var:>+8.1f}{marca}")
+    print(f"\n{len(regressoes)} regressões acima de {limite_pct:.0f}%")
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks da importação UC PJ")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_carga = sub.add_parser("carga", help="to_sql x executemany")
+    p_carga.add_argument("tipos", nargs="*", default=list(TIPOS), choices=TIPOS)
+    p_datas = sub.add_parser("datas", help="parse_date x converte_datas")
+    p_datas.add_argument("--linhas", type=int, default=1_000_000)
+    p_leitura = sub.add_parser("leitura", help="leitura inferida x tipada pelo DDA")
+    p_leitura.add_argument("tipos", nargs="*", default=list(TIPOS), choices=TIPOS)
+    p_motores = sub.add_parser("motores", help="parser pandas x PyArrow")
+    p_motores.add_argument("tipos", nargs="*", default=list(TIPOS), choices=TIPOS)
+    p_indices = sub.add_parser("indices", help="criação de índices e consultas antes/depois")
+    p_indices.add_argument("tipos", nargs="*", default=list(TIPOS), choices=TIPOS)
+    p_indices.add_argument("--db", type=Path, default=None, help="base já importada (padrão: DB_PATH)")
+    p_raios = sub.add_parser("raios", help="consultas por raio: R*Tree x varredura")
+    p_raios.add_argument("tipos", nargs="*", default=list(TIPOS), choices=TIPOS)
+    p_raios.add_argument("--db", type=Path, default=None, help="base já importada (padrão: DB_PATH)")
+    p_gc = sub.add_parser("gc", help="conversão coluna a coluna + GC por chunk x bloco + GC_INTERVAL")
+    p_gc.add_argument("tipos", nargs="*", default=list(TIPOS), choices=TIPOS)
+    p_suite = sub.add_parser("suite", help="inferência + importação + consultas em dados sintéticos")
+    p_suite.add_argument("tamanhos", nargs="*", type=int, default=[100_000, 1_000_000],
+                         help="linhas de BT por rodada (AT = 1%%, MT = 10%%)")
+    p_suite.add_argument("--saida", type=Path, default=None,
+                         help="JSON de resultados (padrão: OUTPUT_DIR/benchmarks/suite_<data>.json)")
+    p_suite.add_argument("--dados", type=Path, default=None,
+                         help="pasta para guardar/reaproveitar os dados gerados (padrão: temporária)")
+    p_suite.add_argument("--rotulo", default="", help="identificação da execução (ex.: commit)")
+    p_suite.add_argument("--repeticoes", type=int, default=5)
+    p_compara = sub.add_parser("compara", help="compara dois resultados da suíte")
+    p_compara.add_argument("base", type=Path)
+    p_compara.add_argument("novo", type=Path)
+    p_compara.add_argument("--limite", type=float, default=10.0, help="variação máxima aceita (%%)")
+    args = parser.parse_args()
+
+    if args.cmd == "suite":
+        saida = args.saida or cp.OUTPUT_DIR / "benchmarks" / f"suite_{time.strftime('%Y%m%d_%H%M%S')}.json"
+        bench_suite(args.tamanhos, saida, args.dados, args.rotulo, args.repeticoes)
+        sys.exit(0)
+    if args.cmd == "compara":
+        sys.exit(1 if compara_resultados(args.base, args.novo, args.limite) else 0)
+    cp.verify_files()
+    if args.cmd == "carga":
+        bench_carga(args.tipos)
+    elif args.cmd == "datas":
+        bench_datas(args.linhas)
+    elif args.cmd == "leitura":
+        bench_leitura(args.tipos)
+    elif args.cmd == "motores":
+        bench_motores(args.tipos)
+    elif args.cmd == "indices":
+        bench_indices(args.tipos, args.db)
+    elif args.cmd == "raios":
+        bench_raios(args.tipos, args.db)
+    elif args.cmd == "gc":
+        bench_gc(args.tipos)
@@ -3,17 +3,26 @@
 """
 Script: Compara3PJ.py
 Descrição: Gera DDA (Dicionário de Dados ANEEL) para UC (AT, MT e BT) com nome do campo, tipo inferido pelo Pandas e tipo_aneel sugerido.
+          Inferência pelas 10k primeiras linhas ou pelo arquivo inteiro em streaming (com estatísticas por coluna).
           Ajusta tipos: NULL/zeros e corrige POINT_X/POINT_Y como REAL.
           Verifica existência de diretórios e arquivos antes de processar.
+          Opcional: tempo/memória por fase e cProfile por tipo (PROFILE_*), gravados junto ao DDA.
 Data: 2025-05-22
 Programador: Ivo Cyrillo
 """
 
 import sys
+import json
+import hashlib
+import time
+import numpy as np
 import pandas as pd
 import zipfile
 import gc
+import cProfile
+import tracemalloc
 import traceback
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 
 # === Configurações ===
@@ -22,7 +31,20 @@ OUTPUT_DIR = Path(r"C:/Projetos/TotalEnergie/BaseDados")
 ENCODING   = "latin1"
 SEP        = ";"
 DECIMAL    = ","
+CSV_ENGINE = "pandas"  # "pandas" (parser C) ou "pyarrow" (parser multithread, requer pyarrow)
+ARROW_BLOCK_SIZE = 64 << 20  # pyarrow: bloco grande o bastante para as 10k linhas (tipos inferidos no 1º bloco)
+INFERENCE_MODE = "head"  # "head" (10k primeiras linhas), "sample" (amostra uniforme do arquivo) ou "full" (arquivo inteiro)
+INFERENCE_CHUNKSIZE = 200_000  # sample/full: linhas por chunk
+SAMPLE_SIZE = 100_000  # sample: tamanho da amostra (reservoir)
+SAMPLE_SEED = 42  # sample: semente do sorteio
+DISTINCT_CAP = 10_000  # sample/full: acima disso a coluna é tratada como alta cardinalidade (distintos vazio)
+USE_CACHE  = True  # pula o tipo se entrada e configurações batem com o manifesto do último DDA
 TEST_MODE  = False  # True para rodar testes interativos de leitura/processamento
+PROFILE_PHASES = False  # True mede o tempo por fase (zip, parse, coerção, estatísticas, montagem do DDA, exportação)
+# True liga o tracemalloc: pico de memória por fase e maiores alocações (mais lento).
+# Só vê alocações do Python/NumPy: buffers internos do parser C do pandas não entram.
+PROFILE_MEMORY = False
+PROFILE_CPROFILE = False  # True grava DDA_ANEEL_uc{tipo}_pj.prof (cProfile) ao lado do DDA
 
 FILES = {
     "at": INPUT_DIR / "ucat_pj.csv",
@@ -31,6 +53,43 @@ FILES = {
 }
 
 
+_FASES = None  # {fase: [segundos, pico_bytes]} do tipo em processamento (None = sem medição)
+_PILHA = []  # tempo gasto nas fases filhas, para o tempo de cada fase ser exclusivo
+_SEM_MEDICAO = nullcontext()
+
+
+@contextmanager
+def _cronometra(nome: str):
+    t0 = time.perf_counter()
+    _PILHA.append(0.0)
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        filhas = _PILHA.pop()
+        if _PILHA:
+            _PILHA[-1] += dt
+        reg = _FASES.setdefault(nome, [0.0, 0])
+        reg[0] += dt - filhas
+        if tracemalloc.is_tracing():
+            # pico desde a última fronteira de fase
+            reg[1] = max(reg[1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+
+
+def fase(nome: str):
+    """Cronometra o bloco na fase nome (tempo exclusivo: fases internas não contam na externa).
+    Sem PROFILE_PHASES devolve um contexto vazio."""
+    return _SEM_MEDICAO if _FASES is None else _cronometra(nome)
+
+
+def abre_zip_csv(z: zipfile.ZipFile):
+    """Abre o CSV de dentro do ZIP (fase zip)."""
+    with fase("zip"):
+        csv_name = next(f for f in z.namelist() if f.lower().endswith(".csv"))
+        return z.open(csv_name)
+
+
 def map_tipo_aneel(campo: str) -> str:
     """Define tipo_aneel com base em prefixos e nome do campo."""
     c = campo.lower()
@@ -59,11 +118,42 @@ def verify_environment():
     print("Diretórios e arquivos encontrados\n")
 
 
-def processar_tipo(tipo: str, path: Path):
-    print(f"Processando '{tipo}' → {path.name}")
+def read_head_arrow(tipo: str, path: Path, nrows: int) -> pd.DataFrame:
+    """Lê as primeiras nrows linhas com o leitor em streaming do PyArrow (tipos inferidos pelo Arrow)."""
     try:
-        # 1) Leitura de até 10k linhas
-        if tipo in ("at", "mt"):
+        import pyarrow as pa
+        from pyarrow import csv as pacsv
+    except ImportError:
+        sys.exit("[ERRO] CSV_ENGINE = 'pyarrow' requer o pacote pyarrow (pip install pyarrow)")
+    read_opts = pacsv.ReadOptions(encoding=ENCODING, block_size=ARROW_BLOCK_SIZE, use_threads=True)
+    parse_opts = pacsv.ParseOptions(delimiter=SEP)
+    conv_opts = pacsv.ConvertOptions(decimal_point=DECIMAL, strings_can_be_null=True)
+
+    def head(src):
+        reader = pacsv.open_csv(src, read_options=read_opts, parse_options=parse_opts,
+                                convert_options=conv_opts)
+        batches, n = [], 0
+        for batch in reader:
+            batches.append(batch)
+            n += batch.num_rows
+            if n >= nrows:
+                break
+        return pa.Table.from_batches(batches, schema=reader.schema).slice(0, nrows).to_pandas()
+
+    if tipo in ("at", "mt"):
+        with fase("parse"):
+            return head(str(path))
+    with zipfile.ZipFile(path) as z, abre_zip_csv(z) as f, fase("parse"):
+        return head(f)
+
+
+def dda_head(tipo: str, path: Path) -> pd.DataFrame:
+    """DDA inferido das 10k primeiras linhas."""
+    # 1) Leitura de até 10k linhas
+    if CSV_ENGINE == "pyarrow":
+        df = read_head_arrow(tipo, path, 10000)
+    elif tipo in ("at", "mt"):
+        with fase("parse"):
             df = pd.read_csv(
                 path,
                 sep=SEP,
@@ -72,21 +162,21 @@ def processar_tipo(tipo: str, path: Path):
                 nrows=10000,
                 low_memory=False
             )
-        else:
-            with zipfile.ZipFile(path) as z:
-                csv_name = next(f for f in z.namelist() if f.lower().endswith(".csv"))
-                with z.open(csv_name) as f:
-                    df = pd.read_csv(
-                        f,
-                        sep=SEP,
-                        decimal=DECIMAL,
-                        encoding=ENCODING,
-                        nrows=10000,
-                        low_memory=False
-                    )
-
-        # 2) Ajuste de nulos e zeros conforme regra:
-        tipo_map = {col: map_tipo_aneel(col) for col in df.columns}
+    else:
+        with zipfile.ZipFile(path) as z:
+            with abre_zip_csv(z) as f, fase("parse"):
+                df = pd.read_csv(
+                    f,
+                    sep=SEP,
+                    decimal=DECIMAL,
+                    encoding=ENCODING,
+                    nrows=10000,
+                    low_memory=False
+                )
+
+    # 2) Ajuste de nulos e zeros conforme regra:
+    tipo_map = {col: map_tipo_aneel(col) for col in df.columns}
+    with fase("coercao"):
         for col, t in tipo_map.items():
             if t in ("REAL", "INTEGER"):
                 # converter para numérico e preencher NaN com 0
@@ -95,14 +185,15 @@ def processar_tipo(tipo: str, path: Path):
                 # texto: manter NaN para nulos
                 df[col] = df[col].where(df[col].notna(), pd.NA)
 
-        # 3) Teste opcional
-        if TEST_MODE:
-            print(f"  [TEST] Linhas lidas: {len(df)}")
-            print(f"  [TEST] Colunas: {list(df.columns)}")
-            print(f"  [TEST] Tipos pandas após ajuste:")
-            print(df.dtypes.to_string())
+    # 3) Teste opcional
+    if TEST_MODE:
+        print(f"  [TEST] Linhas lidas: {len(df)}")
+        print(f"  [TEST] Colunas: {list(df.columns)}")
+        print(f"  [TEST] Tipos pandas após ajuste:")
+        print(df.dtypes.to_string())
 
-        # 4) Montar DDA
+    # 4) Montar DDA
+    with fase("dda"):
         rows = []
         for col in df.columns:
             pandas_dtype = df[col].dtype.name
@@ -112,12 +203,286 @@ def processar_tipo(tipo: str, path: Path):
                 "pandas_dtype": pandas_dtype,
                 "tipo_aneel": tipo_aneel
             })
-        dda_df = pd.DataFrame(rows)
+        return pd.DataFrame(rows)
+
+
+def read_text_chunks(tipo: str, path: Path, chunksize: int):
+    """Gera chunks do arquivo inteiro com todas as colunas como texto (vazio → NaN)."""
+    opts = dict(sep=SEP, encoding=ENCODING, dtype=str, chunksize=chunksize)
+
+    def chunks(reader):
+        while True:
+            with fase("parse"):
+                chunk = next(reader, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    if tipo in ("at", "mt"):
+        with pd.read_csv(path, **opts) as reader:
+            yield from chunks(reader)
+        return
+    with zipfile.ZipFile(path) as z:
+        with abre_zip_csv(z) as f, pd.read_csv(f, **opts) as reader:
+            yield from chunks(reader)
+
+
+def novo_stats() -> dict:
+    return {"linhas": 0, "nulos": 0, "nao_numericos": 0, "min": None, "max": None,
+            "inteiros": True, "max_len": 0, "distintos": set()}
+
+
+def acumula_stats(stats: dict, chunk: pd.DataFrame):
+    """Atualiza estatísticas por coluna com um chunk de texto (chunk descartável depois)."""
+    for col in chunk.columns:
+        st = stats.setdefault(col, novo_stats())
+        s = chunk[col]
+        nn = s.dropna()
+        st["linhas"] += len(s)
+        st["nulos"] += len(s) - len(nn)
+        if nn.empty:
+            continue
+        with fase("coercao"):
+            num = pd.to_numeric(nn.str.replace(DECIMAL, ".", regex=False), errors="coerce")
+        falhas = num.isna()
+        st["nao_numericos"] += int(falhas.sum())
+        ok = num[~falhas]
+        if not ok.empty:
+            lo, hi = float(ok.min()), float(ok.max())
+            st["min"] = lo if st["min"] is None else min(st["min"], lo)
+            st["max"] = hi if st["max"] is None else max(st["max"], hi)
+            st["inteiros"] = st["inteiros"] and bool((ok % 1 == 0).all())
+        st["max_len"] = max(st["max_len"], int(nn.str.len().max()))
+        if st["distintos"] is not None:
+            st["distintos"].update(nn.unique())
+            if len(st["distintos"]) > DISTINCT_CAP:
+                st["distintos"] = None  # alta cardinalidade: para de acumular
+
+
+def pandas_dtype_stats(st: dict, tipo_aneel: str) -> str:
+    """dtype que o pandas teria após o ajuste de nulos/zeros, deduzido das estatísticas."""
+    so_numeros = st["nao_numericos"] == 0
+    if tipo_aneel in ("REAL", "INTEGER"):
+        # to_numeric + fillna(0): só continua int64 se não havia nulo nem fração
+        return "int64" if so_numeros and st["nulos"] == 0 and st["inteiros"] and st["min"] is not None else "float64"
+    if not so_numeros:
+        return "object"
+    if st["min"] is None or st["nulos"] > 0 or not st["inteiros"]:
+        return "float64"
+    return "int64"
+
+
+def dda_from_stats(stats: dict) -> pd.DataFrame:
+    """Monta o DDA (campo, pandas_dtype, tipo_aneel + estatísticas) a partir das estatísticas."""
+    rows = []
+    for col, st in stats.items():
+        tipo_aneel = map_tipo_aneel(col)
+        if tipo_aneel in ("REAL", "INTEGER") and st["nao_numericos"]:
+            print(f"  [AVISO] {col}: {st['nao_numericos']} valores não numéricos (cada um vira 0 na importação)")
+        rows.append({
+            "campo": col,
+            "pandas_dtype": pandas_dtype_stats(st, tipo_aneel),
+            "tipo_aneel": tipo_aneel,
+            "linhas": st["linhas"],
+            "nulos": st["nulos"],
+            "nao_numericos": st["nao_numericos"],
+            "min": st["min"],
+            "max": st["max"],
+            "max_len": st["max_len"],
+            "distintos": len(st["distintos"]) if st["distintos"] is not None else None,
+        })
+    return pd.DataFrame(rows).astype({"distintos": "Int64"})
+
+
+def dda_full(tipo: str, path: Path) -> pd.DataFrame:
+    """DDA inferido do arquivo inteiro, um chunk por vez."""
+    stats = {}
+    for chunk in read_text_chunks(tipo, path, INFERENCE_CHUNKSIZE):
+        with fase("estatisticas"):
+            acumula_stats(stats, chunk)
+        del chunk
+    linhas = next(iter(stats.values()))["linhas"] if stats else 0
+    print(f"  {linhas} linhas analisadas")
+    with fase("dda"):
+        return dda_from_stats(stats)
+
+
+def reservoir_sample(chunks, k: int, seed: int):
+    """Amostra uniforme de k linhas (algoritmo R) num único passe sobre os chunks.
+    Retorna (amostra, linhas_lidas)."""
+    rng = np.random.default_rng(seed)
+    res, cols, cheios, vistos = None, None, 0, 0
+    for chunk in chunks:
+        vals = chunk.to_numpy(dtype=object)
+        n = len(vals)
+        if res is None:
+            cols = chunk.columns
+            res = np.empty((k, len(cols)), dtype=object)
+        # enchimento: primeiras k linhas do arquivo
+        ini = min(k - cheios, n)
+        if ini > 0:
+            res[cheios:cheios + ini] = vals[:ini]
+            cheios += ini
+        # substituição: linha global i entra na posição j ~ U[0, i] se j < k
+        if ini < n:
+            pos = np.arange(ini, n)
+            j = rng.integers(0, vistos + pos + 1)
+            sel = j < k
+            pos, j = pos[sel], j[sel]
+            # mesma posição sorteada mais de uma vez no chunk: vale a última, como no laço sequencial
+            _, ult = np.unique(j[::-1], return_index=True)
+            ult = len(j) - 1 - ult
+            res[j[ult]] = vals[pos[ult]]
+        vistos += n
+        del chunk, vals
+    if res is None:
+        return pd.DataFrame(), 0
+    return pd.DataFrame(res[:cheios], columns=cols), vistos
+
+
+def dda_sample(tipo: str, path: Path):
+    """DDA inferido de uma amostra uniforme de SAMPLE_SIZE linhas do arquivo inteiro."""
+    with fase("amostragem"):
+        amostra, lidas = reservoir_sample(read_text_chunks(tipo, path, INFERENCE_CHUNKSIZE),
+                                          SAMPLE_SIZE, SAMPLE_SEED)
+    stats = {}
+    with fase("estatisticas"):
+        acumula_stats(stats, amostra)
+    print(f"  amostra de {len(amostra)} linhas de {lidas} (semente {SAMPLE_SEED})")
+    with fase("dda"):
+        dda = dda_from_stats(stats)
+    return dda, {"linhas_lidas": lidas, "amostra": len(amostra), "semente": SAMPLE_SEED}
+
+
+def hash_entrada(path: Path) -> str:
+    """Hash rápido do conteúdo: CSV por blake2b do arquivo; ZIP pelos CRCs/tamanhos do
+    diretório central (sem descompactar)."""
+    h = hashlib.blake2b(digest_size=16)
+    if path.suffix.lower() == ".zip":
+        with zipfile.ZipFile(path) as z:
+            for zi in z.infolist():
+                h.update(f"{zi.filename}|{zi.CRC:08x}|{zi.file_size}|{zi.compress_size}\n".encode())
+    else:
+        with open(path, "rb") as f:
+            for bloco in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloco)
+    return h.hexdigest()
+
+
+# configurações que cada modo de inferência usa (só elas entram no manifesto)
+CONFIG_POR_MODO = {
+    "head":   ["CSV_ENGINE"],
+    "sample": ["SAMPLE_SIZE", "SAMPLE_SEED", "DISTINCT_CAP"],
+    "full":   ["DISTINCT_CAP"],
+}
+
+
+def config_inferencia() -> dict:
+    """Configurações que alteram o DDA gerado no modo ativo (entram no manifesto)."""
+    return {"INFERENCE_MODE": INFERENCE_MODE,
+            **{k: globals()[k] for k in CONFIG_POR_MODO.get(INFERENCE_MODE, [])}}
+
+
+def manifest_path(tipo: str) -> Path:
+    return OUTPUT_DIR / f"DDA_ANEEL_uc{tipo}_pj_manifest.json"
+
+
+def le_manifesto(tipo: str) -> dict:
+    """Manifesto do último DDA do tipo (vazio se não há DDA ou manifesto)."""
+    mp = manifest_path(tipo)
+    if not (mp.exists() and (OUTPUT_DIR / f"DDA_ANEEL_uc{tipo}_pj.csv").exists()):
+        return {}
+    return json.loads(mp.read_text(encoding="utf-8"))
+
+
+def monta_manifesto(path: Path, antigo: dict) -> dict:
+    """Manifesto da entrada atual; com nome, tamanho e mtime iguais aos do manifesto antigo o
+    hash é reaproveitado (sem reler o arquivo), senão o conteúdo é hasheado."""
+    st = path.stat()
+    mesmo = (antigo.get("arquivo"), antigo.get("tamanho"), antigo.get("mtime")) == \
+        (path.name, st.st_size, st.st_mtime)
+    return {"arquivo": path.name, "tamanho": st.st_size, "mtime": st.st_mtime,
+            "hash": antigo["hash"] if mesmo else hash_entrada(path), "config": config_inferencia()}
+
+
+def dda_atualizado(antigo: dict, manifesto: dict) -> bool:
+    """True se o manifesto do último DDA bate em tamanho, hash e configurações
+    (mtime diferente só força o hash: cópias do mesmo arquivo não forçam reprocessamento)."""
+    return bool(antigo) and all(antigo.get(k) == manifesto[k] for k in ("arquivo", "tamanho", "hash", "config"))
+
+
+def resumo_fases(tipo: str, total: float) -> dict:
+    """Imprime o tempo (e o pico de memória, com tracemalloc) por fase; devolve para o sidecar."""
+    medido = sum(t for t, _ in _FASES.values())
+    fases = {**_FASES, "outros": [max(total - medido, 0.0), 0]}
+    print(f"  fases de '{tipo}':")
+    print(f"  {'fase':<13} {'tempo (s)':>10} {'%':>6} {'pico (MB)':>10}")
+    for nome, (t, pico) in sorted(fases.items(), key=lambda kv: -kv[1][0]):
+        pico_txt = f"{pico / 2**20:.1f}" if pico else "-"
+        print(f"  {nome:<13} {t:>10.3f} {100 * t / total if total else 0:>6.1f} {pico_txt:>10}")
+    return {nome: {"tempo_s": round(t, 4), **({"pico_mb": round(pico / 2**20, 1)} if pico else {})}
+            for nome, (t, pico) in fases.items()}
+
+
+def maiores_alocacoes(n: int = 10) -> list:
+    """Linhas de código com mais memória alocada ainda viva (snapshot do tracemalloc)."""
+    stats = tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, tracemalloc.__file__)]).statistics("lineno")
+    return [{"local": str(st.traceback[0]), "mb": round(st.size / 2**20, 2), "blocos": st.count}
+            for st in stats[:n]]
+
+
+def processar_tipo(tipo: str, path: Path):
+    global _FASES
+    print(f"Processando '{tipo}' → {path.name}")
+    perfil = None
+    try:
+        manifesto = None
+        if USE_CACHE:
+            antigo = le_manifesto(tipo)
+            manifesto = monta_manifesto(path, antigo)
+            if dda_atualizado(antigo, manifesto):
+                if antigo.get("mtime") != manifesto["mtime"]:
+                    # mesmo conteúdo com outro mtime: próximas execuções não precisam de hash
+                    manifest_path(tipo).write_text(json.dumps(manifesto, indent=2), encoding="utf-8")
+                print(f"Sem alterações desde o último DDA (hash {manifesto['hash']}), pulando.\n")
+                return
+        _FASES = {} if PROFILE_PHASES or PROFILE_MEMORY else None
+        if PROFILE_MEMORY:
+            tracemalloc.start()
+        if PROFILE_CPROFILE:
+            perfil = cProfile.Profile()
+            perfil.enable()
+        t0 = time.perf_counter()
+        info = {}
+        if INFERENCE_MODE == "full":
+            dda_df = dda_full(tipo, path)
+        elif INFERENCE_MODE == "sample":
+            dda_df, info = dda_sample(tipo, path)
+        else:
+            dda_df = dda_head(tipo, path)
+        t_inf = time.perf_counter() - t0
 
         # 5) Exportar DDA
         OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
         out_path = OUTPUT_DIR / f"DDA_ANEEL_uc{tipo}_pj.csv"
-        dda_df.to_csv(out_path, sep=";", encoding=ENCODING, index=False)
+        with fase("exportacao"):
+            dda_df.to_csv(out_path, sep=";", encoding=ENCODING, index=False)
+        if perfil is not None:
+            perfil.disable()
+            perfil.dump_stats(out_path.with_suffix(".prof"))
+            print(f"  cProfile: {out_path.with_suffix('.prof')}")
+        # custo da inferência ao lado do DDA
+        info = {"modo": INFERENCE_MODE, **info, "tempo_s": round(t_inf, 3)}
+        if _FASES is not None:
+            info["fases"] = resumo_fases(tipo, time.perf_counter() - t0)
+        if PROFILE_MEMORY:
+            info["pico_memoria_mb"] = round(max(p for _, p in _FASES.values()) / 2**20, 1)
+            info["maiores_alocacoes"] = maiores_alocacoes()
+        out_path.with_name(out_path.stem + "_inferencia.json").write_text(json.dumps(info, indent=2), encoding="utf-8")
+        if manifesto is not None:
+            manifest_path(tipo).write_text(json.dumps(manifesto, indent=2), encoding="utf-8")
+        print(f"  inferência ({INFERENCE_MODE}) em {t_inf:.1f}s")
         print(f"Exportado: {out_path}\n")
 
     except Exception as e:
@@ -125,9 +490,12 @@ def processar_tipo(tipo: str, path: Path):
         traceback.print_exc()
 
     finally:
+        if perfil is not None:
+            perfil.disable()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        _FASES = None
         # 6) Limpar memória
-        if 'df' in locals():
-            del df
         gc.collect()
 
 
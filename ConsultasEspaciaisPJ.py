@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script: ConsultasEspaciaisPJ.py
+Descrição: Consultas geográficas de UC PJ sobre o índice R*Tree (uc_{tp}_pj_rtree) criado pelo
+           CriaePopulaSQLitePJ com SPATIAL_INDEX = True: UCs num retângulo e UCs num raio (km).
+           Uso: python ConsultasEspaciaisPJ.py <at|mt|bt> <lon> <lat> <raio_km>
+Data: 2026-10-15
+Programador: Ivo Cyrillo
+"""
+
+import sys
+import math
+import sqlite3
+from pathlib import Path
+
+# === Configurações ===
+OUTPUT_DIR    = Path(r"C:/Projetos/TotalEnergie/BaseDados")
+DB_PATH       = OUTPUT_DIR / "mercadoucpj.db"
+RAIO_TERRA_KM = 6371.0088
+KM_POR_GRAU   = math.pi * RAIO_TERRA_KM / 180  # mesmo raio do haversine (~111.195 km)
+
+
+def haversine_km(lon1: float, lat1: float, lon2: float, lat2: float) -> float:
+    """Distância de grande círculo em km entre dois pontos (graus)."""
+    la1, la2 = math.radians(lat1), math.radians(lat2)
+    dlat = la2 - la1
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(la1) * math.cos(la2) * math.sin(dlon / 2) ** 2
+    return 2 * RAIO_TERRA_KM * math.asin(math.sqrt(a))
+
+
+def caixa_do_raio(lon: float, lat: float, raio_km: float):
+    """Retângulo (xmin, ymin, xmax, ymax) em graus que contém o círculo do raio.
+    Longitude pelo ponto de tangência do círculo (asin), não raio / cos(lat): fora do
+    equador o círculo é mais largo que isso; com o polo dentro do círculo, longitude inteira."""
+    dlat = raio_km / KM_POR_GRAU
+    seno = math.sin(raio_km / RAIO_TERRA_KM) / max(math.cos(math.radians(lat)), 1e-12)
+    dlon = math.degrees(math.asin(seno)) if seno < 1 else 180.0
+    return lon - dlon, lat - dlat, lon + dlon, lat + dlat
+
+
+def uc_no_retangulo(con: sqlite3.Connection, tp: str, xmin: float, ymin: float, xmax: float, ymax: float):
+    """UCs (COD_ID, x, y) com coordenada dentro do retângulo, via R*Tree.
+    A R*Tree guarda as caixas em float32 (arredondadas para fora): a busca é por sobreposição
+    e o teste de contenção usa x/y exatos (colunas auxiliares)."""
+    sql = (f'SELECT COD_ID, x, y FROM "uc_{tp}_pj_rtree" '
+           f'WHERE max_x >= ? AND min_x <= ? AND max_y >= ? AND min_y <= ?')
+    return [(cod, x, y) for cod, x, y in con.execute(sql, (xmin, xmax, ymin, ymax))
+            if xmin <= x <= xmax and ymin <= y <= ymax]
+
+
+def uc_no_raio(con: sqlite3.Connection, tp: str, lon: float, lat: float, raio_km: float):
+    """UCs (COD_ID, x, y, distância_km) a até raio_km do ponto, ordenadas pela distância:
+    retângulo pela R*Tree e filtro exato por haversine."""
+    res = []
+    for cod, x, y in uc_no_retangulo(con, tp, *caixa_do_raio(lon, lat, raio_km)):
+        d = haversine_km(lon, lat, x, y)
+        if d <= raio_km:
+            res.append((cod, x, y, d))
+    res.sort(key=lambda r: r[3])
+    return res
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 5:
+        print(__doc__)
+        sys.exit(1)
+    tp, lon, lat, raio = sys.argv[1], float(sys.argv[2]), float(sys.argv[3]), float(sys.argv[4])
+    if not DB_PATH.exists():
+        print(f"[ERRO] Base não encontrada: {DB_PATH}")
+        sys.exit(1)
+    con = sqlite3.connect(DB_PATH)
+    ucs = uc_no_raio(con, tp, lon, lat, raio)
+    print(f"{len(ucs)} UCs {tp.upper()} a até {raio} km de ({lon}, {lat})")
+    for cod, x, y, d in ucs[:20]:
+        print(f"  {cod:<20} {x:>12.6f} {y:>12.6f} {d:>8.2f} km")
+    con.close()
@@ -8,14 +8,25 @@ Data: 2025-05-22
 Programador: Ivo Cyrillo
 """
 
+import io
+import re
+import itertools
+import collections
 import sys
+import json
+import contextlib
+import time
+import sqlite3
 import zipfile
 import gc
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
 import pandas as pd
-from sqlalchemy import create_engine, types, text
+from sqlalchemy import create_engine, event, types, text
 
 # === Configurações ===
 INPUT_DIR     = Path(r"C:/Users/ivocy/Downloads")
@@ -29,7 +40,126 @@ ENCODING      = "latin1"
 SEP           = ";"
 DECIMAL       = ","
 CHUNKSIZE     = 10000
+CHUNK_MEMORY_MB = None  # orçamento de memória por chunk (MB): CHUNKSIZE vira só o tamanho inicial (leitor pandas)
+CHUNK_MIN_ROWS = 1_000
+CHUNK_MAX_ROWS = 1_000_000
+CSV_ENGINE    = "pandas"  # "pandas" (parser C) ou "pyarrow" (parser multithread em blocos, requer pyarrow)
+ARROW_BLOCK_SIZE = 8 << 20  # pyarrow: bytes por bloco/record batch
+TYPED_READ    = False  # True lê as colunas TEXT do DDA como string (texto do arquivo, decimal com ponto); False usa inferência do pandas
+CATEGORICAL_TEXT = False  # True converte colunas TEXT de baixa cardinalidade em category (menos memória por chunk)
+CATEGORICAL_MAX_DISTINCT = 5000  # limite de distintos (DDA sample/full; sem estatísticas, decide no 1º chunk)
+CATEGORICAL_MAX_RATIO = 0.5  # distintos / linhas não nulas: acima disso (PAC, CEP...) category gasta mais que texto
+CATEGORICAL_REPORT = False  # True imprime memory_usage(deep=True) de cada chunk com as colunas como texto x category
+LOAD_ENGINE   = "to_sql"  # "to_sql" (pandas/SQLAlchemy) ou "executemany" (sqlite3 direto)
+GC_INTERVAL   = 100  # gc.collect() a cada N chunks gravados (0 deixa só o GC automático)
+TXN_CHUNKS    = 20  # executemany: chunks por transação explícita
+IMPORT_MODE   = "sequencial"  # "sequencial" ou "pipeline" (leitura/conversão em thread paralela à gravação)
+PIPELINE_QUEUE = 4  # pipeline: máximo de chunks convertidos aguardando gravação
+DELTA_IMPORT  = False  # True aplica só inclusões/alterações/remoções do novo snapshot (use com RECREATE_DB = False)
+DELTA_KEY     = ["COD_ID", "DIST"]  # chave da UC no modo delta (COD_ID só é único dentro da distribuidora)
+RESUME_IMPORT = False  # True retoma carga interrompida a partir de controle_importacao (não apaga a base;
+                       # leitor pandas: supõe campos sem quebra de linha entre aspas)
+PARALLEL_SHARDS = False  # True importa AT, MT e BT em processos separados (um .db por tipo) e mescla
 DATE_FIELDS   = ["DATA_BASE"]  # campos de data a converter
+DATE_AS_ISO_DATE = False  # True grava 'AAAA-MM-DD' em coluna declarada DATE (em vez de TEXT com hora)
+
+# Perfil de PRAGMAs da carga: durabilidade relaxada só faz sentido com base descartável
+# (com RESUME_IMPORT/DELTA_IMPORT a base é mantida e journal/synchronous vêm de PRAGMAS_RESUMABLE)
+IMPORT_PROFILE = RECREATE_DB
+PRAGMAS_IMPORT = {
+    "page_size":    32768,      # só vale antes da primeira tabela (base nova)
+    "journal_mode": "MEMORY",
+    "synchronous":  "OFF",
+    "cache_size":   -262144,    # negativo = KiB → 256 MB
+    "temp_store":   "MEMORY",
+    "mmap_size":    1 << 30,
+}
+PRAGMAS_SAFE = {
+    "journal_mode": "DELETE",
+    "synchronous":  "FULL",
+    "temp_store":   "DEFAULT",
+    "mmap_size":    0,
+}
+# Tabela longa mensal (uc_pj_mensal): uma linha por UC x métrica (ENE, DEM_P, DIC...) x mês
+MONTHLY_TABLE = False
+MONTHLY_TABLE_NAME = "uc_pj_mensal"
+MONTHLY_DIMENSIONS = ["SUB", "CTMT", "MUN"]  # copiadas da UC: agregações por elas sem join
+MONTHLY_SKIP_ZEROS = True  # zeros (inclusive nulos zerados) não geram linha
+MONTHLY_PATTERN = re.compile(r"^(ENE|DEM|DIC|FIC)((?:_[A-Z]+)*)_(\d{2})$", re.IGNORECASE)
+
+# Resumos (resumo_{tp}_{dim}) agregados durante a leitura dos chunks: nº de UCs, energia anual,
+# demanda máxima e DIC/FIC médios por dimensão
+ROLLUPS = False
+ROLLUP_DIMENSIONS = ["MUN", "SUB", "CTMT", "GRU_TAR"]
+ROLLUP_COMBINE = 50  # parciais acumulados por dimensão antes de consolidar
+
+# Codificação por dicionário: colunas TEXT de baixa cardinalidade (colunas "distintos"/"linhas" do DDA,
+# gerado pelo Compara3PJ em modo sample/full) viram INTEGER em uc_{tp}_pj_cod + tabelas dic_{tp}_{col};
+# a view uc_{tp}_pj devolve o layout original. Não se aplica ao modo DELTA_IMPORT.
+# Ganho (base menor, filtros/agrupamentos por código) só nas consultas diretas a uc_{tp}_pj_cod:
+# pela view cada linha paga um join por dicionário e os índices cobrindo colunas codificadas não servem.
+DICT_ENCODING = False
+DICT_MAX_RATIO = 0.05  # distintos / linhas não nulas: acima disso o dicionário não se paga
+DICT_MIN_ROWS = 50_000  # linhas não nulas (no arquivo); abaixo disso as páginas de dic_* custam mais que a economia
+DICT_MAX_DISTINCT = 50_000  # teto do dicionário; só com DDA full (na amostra "distintos" é só da amostra)
+
+# Cópia colunar em Parquet (requer pyarrow): um dataset por tipo em PARQUET_DIR/uc_{tp}_pj,
+# particionado em pastas DIST=.../DATA_BASE=AAAA-MM-DD, gravado chunk a chunk durante a importação
+PARQUET_EXPORT = False
+PARQUET_DIR   = OUTPUT_DIR / "parquet"
+PARQUET_COMPRESSION = "zstd"  # "snappy", "gzip", "zstd", "none"...
+PARQUET_PARTITIONS = ["DIST", "DATA_BASE"]
+PARQUET_ROW_GROUP = 100_000  # linhas acumuladas por partição antes de gravar um row group
+PARQUET_BUFFER_ROWS = 1_000_000  # teto de linhas em buffer somando todas as partições (grava as maiores)
+
+# Índice espacial R*Tree (uc_{tp}_pj_rtree) sobre POINT_X/POINT_Y; consultas em ConsultasEspaciaisPJ.py
+SPATIAL_INDEX = False
+
+# Índices criados só depois da carga (durante os INSERTs só atrasariam).
+# colunas: ordem do índice; unique/where (índice parcial)/nome opcionais.
+# Índices com colunas ausentes na tabela são ignorados com aviso.
+BUILD_INDEXES = True
+INDEX_SPEC = {
+    f"uc_{tp}_pj": [
+        {"colunas": ["COD_ID"]},
+        {"colunas": ["MUN"]},
+        {"colunas": ["SUB"]},
+        {"colunas": ["CTMT"]},
+        # cobre contagens por alimentador x grupo tarifário sem ler a tabela
+        {"colunas": ["CTMT", "GRU_TAR"]},
+        {"colunas": ["DIST", "DATA_BASE"]},
+        # parcial: só UCs com geração distribuída
+        {"colunas": ["CEG_GD"], "where": "CEG_GD IS NOT NULL"},
+    ]
+    for tp in ("at", "mt", "bt")
+}
+INDEX_SPEC[MONTHLY_TABLE_NAME] = [
+    # cobre "energia mensal por alimentador": WHERE metrica = ... GROUP BY CTMT, mes
+    {"colunas": ["metrica", "CTMT", "mes", "valor"]},
+    {"colunas": ["metrica", "SUB", "mes", "valor"]},
+    {"colunas": ["metrica", "MUN", "mes", "valor"]},
+    {"colunas": ["COD_ID"]},
+]
+
+# Checkpoints e o histórico do modo delta (uc_*_pj_hist) precisam sobreviver a queda do processo
+# ou de energia: WAL mantém a atomicidade com synchronous NORMAL
+PRAGMAS_RESUMABLE = {
+    "journal_mode": "WAL",
+    "synchronous":  "NORMAL",
+}
+TIMINGS_PATH  = OUTPUT_DIR / "tempos_importacao.json"  # histórico de tempos por perfil
+# Instrumentação por chunk: tempo por etapa (leitura, arquivo, conversão, datas, gravação...),
+# linhas/s, bytes lidos, RSS (atual, variação no chunk e pico do processo) em JSON lines + tabela-resumo por tipo
+INSTRUMENTACAO = False
+INSTRUMENTACAO_PATH = OUTPUT_DIR / "instrumentacao_importacao.jsonl"
+
+class DATE_ISO(types.UserDefinedType):
+    """Coluna declarada DATE no SQLite que recebe o texto 'AAAA-MM-DD' sem conversão."""
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "DATE"
+
 
 # Map tipo_aneel -> SQLAlchemy
 SQL_TYPE_MAP = {
@@ -38,6 +168,14 @@ SQL_TYPE_MAP = {
     "TEXT":    types.TEXT,
 }
 
+# Map tipo_aneel -> dtype do pandas na leitura tipada
+# REAL/INTEGER ficam com a inferência do parser C (float64/int64 com DECIMAL): forçar float64
+# aborta a leitura inteira no primeiro valor não numérico ('#N/D'); a coluna com esse valor
+# vem como texto e converte_chunk converte só ela (o valor inválido vira 0)
+READ_DTYPE_MAP = {
+    "TEXT":    "string",
+}
+
 # Arquivos de dados por tipo
 FILES = {
     "at": INPUT_DIR / "ucat_pj.csv",
@@ -75,69 +213,1339 @@ def load_dda(tp: str):
     return dict(zip(dda_df['campo'], dda_df['tipo_aneel']))
 
 
-def read_data_chunk(tp: str, path, chunksize):
-    """Retorna iterator de DataFrame por chunks."""
+def load_dda_distintos(tp: str) -> dict:
+    """Carrega do DDA campo->(nº de valores distintos, linhas não nulas) (vazio se o DDA não tem estatísticas)."""
+    dda_df = pd.read_csv(DDA_FILES[tp], sep=SEP, encoding=ENCODING, low_memory=False)
+    if 'distintos' not in dda_df.columns:
+        return {}
+    dda_df = dda_df[dda_df['distintos'].notna()]
+    return dict(zip(dda_df['campo'], zip(dda_df['distintos'].astype(int),
+                                         (dda_df['linhas'] - dda_df['nulos']).astype(int))))
+
+
+def read_dtypes(tipo_map: dict) -> dict:
+    """Especificação dtype do read_csv a partir do DDA (colunas já tipadas na leitura)."""
+    return {col: READ_DTYPE_MAP[t] for col, t in tipo_map.items() if t in READ_DTYPE_MAP}
+
+
+def read_data_chunk(tp: str, path, chunksize, dtype=None, skip=0, medidor: dict = None):
+    """Gera DataFrames por chunks (tipados quando dtype é informado), pulando as skip primeiras
+    linhas de dados; send(n) muda o nº de linhas dos chunks seguintes. Os arquivos abertos aqui
+    (CSV, ZIP do BT) são fechados ao fim da leitura ou no close() do gerador. Com medidor, o
+    arquivo é lido via ArquivoMedido (guardado em medidor["arquivo"]).
+    O skip descarta linhas físicas: supõe registros sem quebra de linha dentro de campos entre
+    aspas (caso dos arquivos da ANEEL); com elas a retomada ficaria desalinhada do checkpoint."""
+    with contextlib.ExitStack() as abertos:
+        if tp in ('at','mt'):
+            src = abertos.enter_context(open(path, 'rb')) if skip or medidor is not None else path
+        else:
+            # BT como ZIP
+            z = abertos.enter_context(zipfile.ZipFile(path))
+            csv_name = next(f for f in z.namelist() if f.lower().endswith('.csv'))
+            src = abertos.enter_context(z.open(csv_name))
+        opts = {}
+        if skip:
+            # skiprows (inteiro ou range) vira um set com todos os números de linha (20M linhas → ~1.6 GB):
+            # as linhas já gravadas são descartadas do próprio arquivo e o cabeçalho vai por names
+            nomes = list(pd.read_csv(io.BytesIO(src.readline()), sep=SEP, encoding=ENCODING, nrows=0).columns)
+            collections.deque(itertools.islice(src, skip), maxlen=0)
+            opts = dict(header=None, names=nomes)
+        if medidor is not None:
+            src = medidor["arquivo"] = ArquivoMedido(src)
+        reader = abertos.enter_context(
+            pd.read_csv(src, sep=SEP, decimal=DECIMAL, dtype=dtype, encoding=ENCODING,
+                        chunksize=chunksize, iterator=True, low_memory=False, **opts))
+        tamanho = chunksize
+        while True:
+            try:
+                chunk = reader.get_chunk(tamanho)
+            except StopIteration:
+                return
+            tamanho = (yield chunk) or tamanho
+
+
+def read_data_batches(tp: str, path, tipo_map: dict, skip=0, medidor: dict = None, categoricas=()):
+    """Lê o arquivo com o leitor em streaming do PyArrow e gera um DataFrame por record batch.
+    Tudo é lido como texto (transcodificação latin1); REAL/INTEGER são convertidos em float64
+    por batch, e a coluna com valor não numérico fica como texto para o converte_chunk.
+    As colunas de categoricas são lidas como dictionary (category no pandas)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        from pyarrow import csv as pacsv
+    except ImportError:
+        sys.exit("[ERRO] CSV_ENGINE = 'pyarrow' requer o pacote pyarrow (pip install pyarrow)")
+    read_opts = pacsv.ReadOptions(encoding=ENCODING, block_size=ARROW_BLOCK_SIZE, use_threads=True,
+                                  skip_rows_after_names=skip)
+    parse_opts = pacsv.ParseOptions(delimiter=SEP)
+    # double fixo no schema aborta o leitor inteiro ('ArrowInvalid') no primeiro '#N/D'
+    conv_opts = pacsv.ConvertOptions(
+        column_types={col: pa.dictionary(pa.int32(), pa.string()) if col in categoricas else pa.string()
+                      for col in tipo_map},
+        strings_can_be_null=True,  # vazio → nulo, como no pandas
+    )
+    numericas = [col for col, t in tipo_map.items() if t in ('REAL', 'INTEGER')]
+
+    def batches(src):
+        reader = pacsv.open_csv(src, read_options=read_opts, parse_options=parse_opts,
+                                convert_options=conv_opts)
+        for batch in reader:
+            for col in numericas:
+                i = batch.schema.get_field_index(col)
+                if i < 0:
+                    continue
+                try:
+                    arr = pc.cast(pc.replace_substring(batch.column(i), DECIMAL, '.'), pa.float64())
+                except pa.ArrowInvalid:
+                    continue
+                batch = batch.set_column(i, col, arr)
+            yield batch.to_pandas()
+
     if tp in ('at','mt'):
-        return pd.read_csv(path, sep=SEP, decimal=DECIMAL,
-                           encoding=ENCODING, chunksize=chunksize, iterator=True, low_memory=False)
-    # BT como ZIP
-    z = zipfile.ZipFile(path)
-    csv_name = next(f for f in z.namelist() if f.lower().endswith('.csv'))
-    return pd.read_csv(z.open(csv_name), sep=SEP, decimal=DECIMAL,
-                       encoding=ENCODING, chunksize=chunksize, iterator=True, low_memory=False)
+        if medidor is None:
+            yield from batches(str(path))
+        else:
+            with ArquivoMedido(open(path, 'rb')) as f:
+                medidor["arquivo"] = f
+                yield from batches(f)
+        return
+    # BT como ZIP: streaming direto do membro compactado
+    with zipfile.ZipFile(path) as z:
+        csv_name = next(f for f in z.namelist() if f.lower().endswith('.csv'))
+        with z.open(csv_name) as f:
+            if medidor is not None:
+                f = medidor["arquivo"] = ArquivoMedido(f)
+            yield from batches(f)
 
 
 def parse_date(val: str) -> str:
-    """Converte '31DEC2023:00:00:00.0000000' → '2023-12-31T00:00:00'"""
+    """Converte '31DEC2023:00:00:00.0000000' → '2023-12-31T00:00:00' (ou '2023-12-31' com DATE_AS_ISO_DATE)"""
     try:
-        dt = datetime.strptime(val, '%d%b%Y:%H:%M:%S.%f')
-        return dt.strftime('%Y-%m-%dT%H:%M:%S')
+        # fração descartada: %f aceita no máximo 6 dígitos e o arquivo traz 7
+        dt = datetime.strptime(val.split('.')[0], '%d%b%Y:%H:%M:%S')
+        return dt.strftime('%Y-%m-%d' if DATE_AS_ISO_DATE else '%Y-%m-%dT%H:%M:%S')
     except Exception:
         return None
 
 
-def importa_tipo(tp: str):
+def converte_datas(serie: pd.Series) -> pd.Series:
+    """Converte coluna de datas parseando cada valor distinto uma única vez."""
+    mapa = {v: parse_date(v) for v in serie.dropna().unique()}
+    return serie.map(mapa).astype(object).where(serie.notna(), None)
+
+
+def aplica_pragmas(dbapi_con, pragmas: dict):
+    """Executa PRAGMA chave = valor numa conexão DBAPI (sqlite3)."""
+    cur = dbapi_con.cursor()
+    for k, v in pragmas.items():
+        cur.execute(f"PRAGMA {k} = {v}")
+    cur.close()
+
+
+def pragmas_importacao() -> dict:
+    """PRAGMAS_IMPORT; com RESUME_IMPORT ou DELTA_IMPORT (base mantida: checkpoints, histórico),
+    journal/synchronous que preservam a base em caso de queda."""
+    duravel = RESUME_IMPORT or DELTA_IMPORT
+    return {**PRAGMAS_IMPORT, **PRAGMAS_RESUMABLE} if duravel else dict(PRAGMAS_IMPORT)
+
+
+def _pragmas_import_on_connect(dbapi_con, connection_record):
+    aplica_pragmas(dbapi_con, pragmas_importacao())
+
+
+def ativa_perfil_importacao(engine):
+    """Aplica PRAGMAS_IMPORT em toda conexão aberta pelo engine durante a carga."""
+    event.listen(engine, "connect", _pragmas_import_on_connect)
+    engine.dispose()  # conexões já no pool não passariam pelo evento
+    print("Perfil de importação ativo:", ", ".join(f"{k}={v}" for k, v in pragmas_importacao().items()))
+
+
+def finaliza_perfil_importacao(engine):
+    """Restaura PRAGMAS_SAFE e roda ANALYZE/VACUUM ao final da carga."""
+    if event.contains(engine, "connect", _pragmas_import_on_connect):
+        event.remove(engine, "connect", _pragmas_import_on_connect)
+    engine.dispose()
+    raw = engine.raw_connection()
+    try:
+        aplica_pragmas(raw, PRAGMAS_SAFE)
+        cur = raw.cursor()
+        t0 = time.perf_counter()
+        cur.execute("ANALYZE")
+        raw.commit()
+        cur.execute("VACUUM")
+        cur.close()
+        print(f"ANALYZE/VACUUM em {time.perf_counter() - t0:.1f}s")
+    finally:
+        raw.close()
+
+
+def resumo_tempos(tempos: dict, perfil: str):
+    """Imprime tempos por tipo e a diferença para a última carga com o outro perfil."""
+    hist = {}
+    if TIMINGS_PATH.exists():
+        hist = json.loads(TIMINGS_PATH.read_text(encoding="utf-8"))
+    outro = hist.get("padrao" if perfil == "importacao" else "importacao", {})
+    print(f"\nResumo da importação (perfil: {perfil})")
+    print(f"{'etapa':<14} {'tempo (s)':>10} {'outro perfil (s)':>17} {'diferença (s)':>14}")
+    for tp, dt in tempos.items():
+        ref = outro.get(tp)
+        ref_txt = f"{ref:.1f}" if ref is not None else "-"
+        dif_txt = f"{dt - ref:+.1f}" if ref is not None else "-"
+        print(f"{tp:<14} {dt:>10.1f} {ref_txt:>17} {dif_txt:>14}")
+    hist[perfil] = tempos
+    TIMINGS_PATH.write_text(json.dumps(hist, indent=2), encoding="utf-8")
+
+
+def pico_rss_mb() -> float:
+    """Pico de memória residente do processo em MB (None se indisponível)."""
+    try:
+        # Linux: VmHWM é do processo atual; ru_maxrss herda o pico do pai num fork+exec (spawn)
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmHWM:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return kb / 1024 if sys.platform != "darwin" else kb / 1024 ** 2
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 1024 ** 2
+        except (ImportError, AttributeError):
+            return None
+
+
+def rss_mb() -> float:
+    """Memória residente atual do processo em MB (None se indisponível)."""
+    try:
+        with open("/proc/self/status") as f:
+            for linha in f:
+                if linha.startswith("VmRSS:"):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 ** 2
+    except ImportError:
+        return None
+
+
+class ArquivoMedido(io.RawIOBase):
+    """Arquivo binário que conta bytes entregues ao parser e o tempo gasto em read
+    (disco e, no ZIP do BT, descompressão)."""
+
+    def __init__(self, f):
+        self.f = f
+        self.bytes = 0
+        self.tempo = 0.0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        t0 = time.perf_counter()
+        n = self.f.readinto(b)
+        self.tempo += time.perf_counter() - t0
+        self.bytes += n or 0
+        return n
+
+    def close(self):
+        self.f.close()
+        super().close()
+
+
+_SEM_MEDICAO = contextlib.nullcontext()
+
+
+@contextlib.contextmanager
+def _cronometra(med: dict, nome: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        med[nome] = med.get(nome, 0.0) + time.perf_counter() - t0
+
+
+def etapa(med: dict, nome: str):
+    """Soma o tempo do bloco à etapa nome da medição do chunk; sem medição (INSTRUMENTACAO
+    desligada, med None) devolve um contexto vazio compartilhado."""
+    return _SEM_MEDICAO if med is None else _cronometra(med, nome)
+
+
+def registra_chunk(saida, tp: str, n: int, linhas: int, med: dict, resumo: dict):
+    """Grava a linha JSON do chunk e acumula no resumo do tipo. Memória: RSS atual ao fim do
+    chunk, variação desde o chunk anterior e pico do processo até aqui (VmHWM, nunca diminui:
+    não é o pico do chunk)."""
+    total = sum(v for k, v in med.items() if k != 'bytes')
+    rss, anterior = rss_mb(), resumo.get("rss_mb")
+    reg = {"tipo": tp, "chunk": n, "linhas": linhas, "bytes": med.pop('bytes', 0),
+           "etapas_s": {k: round(v, 6) for k, v in med.items()}, "total_s": round(total, 6),
+           "linhas_s": round(linhas / total) if total else None, "rss_mb": rss,
+           "rss_delta_mb": round(rss - anterior, 3) if rss is not None and anterior is not None else None,
+           "rss_max_processo_mb": pico_rss_mb()}
+    saida.write(json.dumps(reg) + "\n")
+    saida.flush()
+    resumo["linhas"] = resumo.get("linhas", 0) + linhas
+    resumo["bytes"] = resumo.get("bytes", 0) + reg["bytes"]
+    resumo["rss_mb"] = rss
+    resumo["rss_max_processo_mb"] = reg["rss_max_processo_mb"]
+    for k, v in med.items():
+        resumo.setdefault("etapas", {})[k] = resumo.get("etapas", {}).get(k, 0.0) + v
+
+
+def resumo_instrumentacao(tp: str, resumo: dict, parede: float):
+    """Tabela final por etapa: tempo, % do tempo medido e linhas/s da etapa."""
+    etapas = resumo.get("etapas", {})
+    medido = sum(etapas.values())
+    linhas = resumo.get("linhas", 0)
+    print(f"\nEtapas da importação {tp} ({linhas} linhas, {resumo.get('bytes', 0) / 2**20:.1f} MB lidos, "
+          f"pico RSS do processo {resumo.get('rss_max_processo_mb') or 0:.0f} MB, {linhas / parede if parede else 0:,.0f} linhas/s)")
+    print(f"{'etapa':<14} {'tempo (s)':>10} {'%':>6} {'linhas/s':>12}")
+    for k, v in sorted(etapas.items(), key=lambda kv: -kv[1]):
+        print(f"{k:<14} {v:>10.2f} {100 * v / medido if medido else 0:>6.1f} {linhas / v if v else 0:>12,.0f}")
+
+
+def insert_sql(table: str, columns) -> str:
+    """Monta INSERT preparado com placeholders '?' para as colunas informadas."""
+    cols = ", ".join(f'"{c}"' for c in columns)
+    marks = ", ".join("?" for _ in columns)
+    return f'INSERT INTO "{table}" ({cols}) VALUES ({marks})'
+
+
+def chunk_rows(chunk: pd.DataFrame):
+    """Converte chunk em tuplas de tipos Python nativos (NaN/NA → None) para o sqlite3."""
+    obj = chunk.astype(object)
+    return list(obj.where(chunk.notna(), None).itertuples(index=False, name=None))
+
+
+def insere(destino, table: str, df: pd.DataFrame):
+    """Anexa df à tabela na transação corrente: cursor sqlite3 (executemany) ou
+    conexão SQLAlchemy (to_sql)."""
+    if isinstance(destino, sqlite3.Cursor):
+        destino.executemany(insert_sql(table, df.columns), chunk_rows(df))
+    else:
+        df.to_sql(table, destino, if_exists='append', index=False)
+
+
+def colunas_mensais(tipo_map: dict) -> dict:
+    """Mapeia colunas mensais do DDA → (métrica, mês), ex.: DEM_P_03 → ('DEM_P', 3)."""
+    mapa = {}
+    for col in tipo_map:
+        m = MONTHLY_PATTERN.match(col)
+        if m:
+            mapa[col] = ((m.group(1) + m.group(2)).upper(), int(m.group(3)))
+    return mapa
+
+
+def prepara_mensal(engine, tp: str, limpar: bool):
+    """Cria a tabela longa se preciso e, numa carga do zero, remove as linhas antigas do tipo."""
+    dims = "".join(f', "{d}" TEXT' for d in MONTHLY_DIMENSIONS)
+    with engine.begin() as con:
+        con.execute(text(f'CREATE TABLE IF NOT EXISTS "{MONTHLY_TABLE_NAME}" '
+                         f'("COD_ID" TEXT, "tipo" TEXT, "metrica" TEXT, "mes" INTEGER, "valor" REAL{dims})'))
+        if limpar:
+            con.execute(text(f'DELETE FROM "{MONTHLY_TABLE_NAME}" WHERE "tipo" = :tp'), {"tp": tp})
+
+
+def chunk_mensal(chunk: pd.DataFrame, tp: str, mensal: dict) -> pd.DataFrame:
+    """Converte as colunas mensais do chunk (largo) em linhas (COD_ID, tipo, metrica, mes, valor, dims)."""
+    dims = [d for d in MONTHLY_DIMENSIONS if d in chunk.columns]
+    longo = chunk.melt(id_vars=["COD_ID"] + dims, value_vars=list(mensal),
+                       var_name="coluna", value_name="valor")
+    if MONTHLY_SKIP_ZEROS:
+        longo = longo[longo["valor"] != 0]
+    col = longo.pop("coluna")
+    longo.insert(1, "tipo", tp)
+    longo.insert(2, "metrica", col.map({c: m for c, (m, _) in mensal.items()}))
+    longo.insert(3, "mes", col.map({c: mes for c, (_, mes) in mensal.items()}))
+    return longo
+
+
+_ROLLUP_AGG = {"n_uc": "sum", "ene_anual": "sum", "dem_max": "max",
+               "dic_soma": "sum", "dic_n": "sum", "fic_soma": "sum", "fic_n": "sum"}
+
+
+def grupos_metricas(tipo_map: dict) -> dict:
+    """Colunas mensais agrupadas por família: ENE, DEM, DIC, FIC (DEM_P/DEM_F contam como DEM)."""
+    grupos = {"ENE": [], "DEM": [], "DIC": [], "FIC": []}
+    for col, (metrica, _) in colunas_mensais(tipo_map).items():
+        grupos[metrica.split("_")[0]].append(col)
+    return grupos
+
+
+def rollup_parcial(chunk: pd.DataFrame, dim: str, grupos: dict) -> pd.DataFrame:
+    """Agregado parcial do chunk por dim (somas e contagens, para consolidar depois)."""
+    base = pd.DataFrame({
+        dim: chunk[dim].astype(object),
+        "n_uc": 1,
+        "ene_anual": chunk[grupos["ENE"]].sum(axis=1),
+        "dem_max": chunk[grupos["DEM"]].max(axis=1),
+        "dic_soma": chunk[grupos["DIC"]].sum(axis=1),
+        "dic_n": len(grupos["DIC"]),
+        "fic_soma": chunk[grupos["FIC"]].sum(axis=1),
+        "fic_n": len(grupos["FIC"]),
+    }, index=chunk.index)
+    return base.groupby(dim, dropna=False, sort=False).agg(_ROLLUP_AGG)
+
+
+def consolida_rollup(parciais: list) -> pd.DataFrame:
+    return pd.concat(parciais).groupby(level=0, dropna=False, sort=False).agg(_ROLLUP_AGG)
+
+
+def acumula_rollups(acc: dict, chunk: pd.DataFrame, grupos: dict):
+    """Soma o chunk aos parciais de cada dimensão; consolida a cada ROLLUP_COMBINE chunks."""
+    for dim in ROLLUP_DIMENSIONS:
+        if dim not in chunk.columns:
+            continue
+        parciais = acc.setdefault(dim, [])
+        parciais.append(rollup_parcial(chunk, dim, grupos))
+        if len(parciais) >= ROLLUP_COMBINE:
+            acc[dim] = [consolida_rollup(parciais)]
+
+
+def grava_rollups(engine, tp: str, acc: dict):
+    """Consolida os parciais e grava resumo_{tp}_{dim} (substitui o anterior)."""
+    grupos = []
+    for dim, parciais in acc.items():
+        df = consolida_rollup(parciais)
+        grupos.append(f"{dim} ({len(df)})")
+        df["dic_medio"] = df["dic_soma"] / df["dic_n"].where(df["dic_n"] > 0)
+        df["fic_medio"] = df["fic_soma"] / df["fic_n"].where(df["fic_n"] > 0)
+        out = df[["n_uc", "ene_anual", "dem_max", "dic_medio", "fic_medio"]].reset_index()
+        out.to_sql(f"resumo_{tp}_{dim.lower()}", engine, if_exists="replace", index=False)
+    print(f"   resumos {tp}: {', '.join(grupos)}")
+
+
+def rollups_da_tabela(engine, table: str, tipo_map: dict) -> dict:
+    """Recalcula os resumos lendo a tabela já gravada (carga retomada: chunks anteriores não passaram aqui)."""
+    grupos = grupos_metricas(tipo_map)
+    acc = {}
+    for chunk in pd.read_sql_query(f'SELECT * FROM "{table}"', engine, chunksize=CHUNKSIZE):
+        acumula_rollups(acc, chunk, grupos)
+    return acc
+
+
+def inferencia_dda(tp: str) -> dict:
+    """Sidecar _inferencia.json do DDA (modo e linhas lidas); vazio se não existir."""
+    path = DDA_FILES[tp].with_name(DDA_FILES[tp].stem + '_inferencia.json')
+    return json.loads(path.read_text(encoding='utf-8')) if path.exists() else {}
+
+
+def colunas_dicionario(tp: str, tipo_map: dict) -> list:
+    """Colunas TEXT a codificar (nunca chave/datas): distintos/linhas não nulas até DICT_MAX_RATIO
+    e ao menos DICT_MIN_ROWS linhas não nulas. Com DDA por amostra a razão vem da amostra (cota
+    alta: na amostra os valores repetem menos) e as linhas são extrapoladas para o arquivo."""
+    if not DICT_ENCODING:
+        return []
+    if DELTA_IMPORT:
+        print("[AVISO] DICT_ENCODING ignorado no modo DELTA_IMPORT")
+        return []
+    dda = pd.read_csv(DDA_FILES[tp], sep=SEP, encoding=ENCODING, low_memory=False)
+    if 'distintos' not in dda.columns:
+        print(f"[AVISO] DDA de {tp} sem coluna 'distintos' (gere com INFERENCE_MODE sample/full): "
+              f"sem codificação por dicionário")
+        return []
+    info = inferencia_dda(tp)
+    amostra = info.get('modo') == 'sample'
+    escala = info['linhas_lidas'] / info['amostra'] if amostra and info.get('amostra') else 1.0
+    cols = []
+    for r in dda.itertuples(index=False):
+        nao_nulos = r.linhas - r.nulos
+        if (tipo_map.get(r.campo) != 'TEXT' or r.campo == "COD_ID" or r.campo in DATE_FIELDS
+                or pd.isna(r.distintos) or nao_nulos <= 0):
+            continue
+        if (r.distintos / nao_nulos <= DICT_MAX_RATIO and nao_nulos * escala >= DICT_MIN_ROWS
+                and (amostra or r.distintos <= DICT_MAX_DISTINCT)):
+            cols.append(r.campo)
+    return cols
+
+
+def tabela_dic(tp: str, col: str) -> str:
+    return f'dic_{tp}_{col}'
+
+
+def prepara_dicionarios(engine, tp: str, cols: list, limpar: bool) -> dict:
+    """Cria as tabelas dic_{tp}_{col}; numa carga retomada recarrega os códigos já gravados."""
+    dics = {}
+    with engine.begin() as con:
+        for col in cols:
+            dic = tabela_dic(tp, col)
+            con.execute(text(f'CREATE TABLE IF NOT EXISTS "{dic}" (id INTEGER PRIMARY KEY, valor TEXT)'))
+            if limpar:
+                con.execute(text(f'DELETE FROM "{dic}"'))
+            dics[col] = dict((v, i) for i, v in con.execute(text(f'SELECT id, valor FROM "{dic}"')))
+    return dics
+
+
+def codifica_chunk(chunk: pd.DataFrame, dics: dict):
+    """Troca valores das colunas de dics por códigos inteiros (dics cresce com os valores novos).
+    Retorna (chunk codificado, {col: DataFrame id/valor dos códigos novos})."""
+    codigos, novos = {}, {}
+    for col, d in dics.items():
+        s = chunk[col]
+        faltam = [v for v in s.dropna().unique() if v not in d]
+        if faltam:
+            ini = len(d) + 1
+            d.update(zip(faltam, range(ini, ini + len(faltam))))
+            novos[col] = pd.DataFrame({"id": range(ini, ini + len(faltam)), "valor": faltam})
+        codigos[col] = s.map(d).astype("Int64")
+    return chunk.assign(**codigos), novos
+
+
+def cria_view_dicionario(engine, tp: str, colunas: list, cods: list):
+    """View uc_{tp}_pj com o layout original sobre uc_{tp}_pj_cod + dicionários, para os consumidores
+    existentes. Compatibilidade, não velocidade: cada linha lida pela view faz um LEFT JOIN por
+    dicionário (busca pelo rowid, id INTEGER PRIMARY KEY; dicionário de poucas linhas o SQLite
+    prefere varrer) e filtros/agrupamentos por coluna codificada perdem os índices cobrindo da
+    tabela (GROUP BY MUN na view ~10x mais lento que na tabela sem codificação). Consultas que
+    precisam ser rápidas vão direto a uc_{tp}_pj_cod, juntando o dicionário só no resultado."""
+    view, base = f'uc_{tp}_pj', f'uc_{tp}_pj_cod'
+    sel, joins = [], []
+    for col in colunas:
+        if col in cods:
+            alias = f'd_{col}'
+            sel.append(f'{alias}.valor AS "{col}"')
+            joins.append(f'LEFT JOIN "{tabela_dic(tp, col)}" {alias} ON {alias}.id = c."{col}"')
+        else:
+            sel.append(f'c."{col}"')
+    with engine.begin() as con:
+        tipo = con.execute(text("SELECT type FROM sqlite_master WHERE name = :n"), {"n": view}).scalar()
+        if tipo:
+            con.execute(text(f'DROP {tipo.upper()} "{view}"'))
+        con.execute(text(f'CREATE VIEW "{view}" AS SELECT {", ".join(sel)} FROM "{base}" c {" ".join(joins)}'))
+        for col in cods:
+            con.execute(text(f'CREATE UNIQUE INDEX IF NOT EXISTS "ux_{tabela_dic(tp, col)}_valor" '
+                             f'ON "{tabela_dic(tp, col)}" (valor)'))
+
+
+def tabela_fisica(cur, table: str) -> str:
+    """uc_{tp}_pj_cod quando uc_{tp}_pj é a view da codificação por dicionário."""
+    tipo = cur.execute("SELECT type FROM sqlite_master WHERE name = ?", (table,)).fetchone()
+    if tipo and tipo[0] == 'view':
+        if cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                       (f'{table}_cod',)).fetchone():
+            return f'{table}_cod'
+    return table
+
+
+def prepara_parquet(tp: str, tipo_map: dict) -> dict:
+    """Estado da exportação Parquet do tipo: schema pelo DDA e um writer por partição."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        sys.exit("[ERRO] PARQUET_EXPORT requer o pacote pyarrow (pip install pyarrow)")
+    pa_types = {"INTEGER": pa.int64(), "REAL": pa.float64(), "TEXT": pa.string()}
+    particoes = [c for c in PARQUET_PARTITIONS if c in tipo_map]
+    schema = pa.schema([(col, pa.date32() if col in DATE_FIELDS else pa_types[t])
+                        for col, t in tipo_map.items() if col not in particoes])
+    destino = PARQUET_DIR / f'uc_{tp}_pj'
+    if destino.exists():
+        for f in destino.rglob('*.parquet'):
+            f.unlink()
+    inteiras = {col for col, t in tipo_map.items() if t == 'INTEGER' and col not in particoes}
+    textos = [col for col, t in tipo_map.items() if t == 'TEXT' and col not in particoes and col not in DATE_FIELDS]
+    return {"pa": pa, "pq": pq, "dir": destino, "schema": schema, "particoes": particoes,
+            "inteiras": inteiras, "textos": textos, "writers": {}, "buffers": {}, "linhas": {}, "em_buffer": 0}
+
+
+def valor_particao(v, data: bool = False) -> str:
+    """Nome de pasta da partição: datas como AAAA-MM-DD, nulos como __NULL__."""
+    if v is None or pd.isna(v):
+        return '__NULL__'
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    v = str(v)[:10] if data else str(v)
+    return re.sub(r'[\\/:*?"<>|]', '_', v)
+
+
+def arquivo_particao(estado: dict, chave: tuple) -> Path:
+    pasta = estado["dir"].joinpath(*(f'{c}={v}' for c, v in zip(estado["particoes"], chave)))
+    return pasta / 'part-0.parquet'
+
+
+def grava_particao(estado: dict, chave: tuple):
+    """Grava o buffer da partição como um row group (abre o arquivo na primeira vez)."""
+    pa, pq = estado["pa"], estado["pq"]
+    partes = estado["buffers"].pop(chave)
+    estado["em_buffer"] -= estado["linhas"].pop(chave)
+    df = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+    writer = estado["writers"].get(chave)
+    if writer is None:
+        arquivo = arquivo_particao(estado, chave)
+        arquivo.parent.mkdir(parents=True, exist_ok=True)
+        writer = pq.ParquetWriter(arquivo, estado["schema"], compression=PARQUET_COMPRESSION)
+        estado["writers"][chave] = writer
+    writer.write_table(pa.Table.from_pandas(df, schema=estado["schema"], preserve_index=False))
+
+
+def promove_double(estado: dict, cols: list):
+    """Colunas INTEGER do DDA com valor fracionário passam a double no dataset inteiro (o cast
+    para int64 falharia): os arquivos já gravados são regravados row group a row group."""
+    pa, pq = estado["pa"], estado["pq"]
+    print(f"[AVISO] parquet {estado['dir'].name}: {', '.join(cols)} (INTEGER no DDA) com valores "
+          f"fracionários, exportadas como double")
+    schema = estado["schema"]
+    for col in cols:
+        schema = schema.set(schema.get_field_index(col), pa.field(col, pa.float64()))
+    estado["schema"] = schema
+    estado["inteiras"].difference_update(cols)
+    for chave, writer in estado["writers"].items():
+        writer.close()
+        arquivo = arquivo_particao(estado, chave)
+        antigo = arquivo.with_suffix('.tmp')
+        arquivo.replace(antigo)
+        writer = estado["writers"][chave] = pq.ParquetWriter(arquivo, schema, compression=PARQUET_COMPRESSION)
+        origem = pq.ParquetFile(antigo)
+        for i in range(origem.num_row_groups):
+            writer.write_table(origem.read_row_group(i).cast(schema))
+        origem.close()
+        antigo.unlink()
+
+
+def exporta_parquet(estado: dict, chunk: pd.DataFrame):
+    """Distribui o chunk convertido pelas partições; cada buffer vai a disco ao atingir
+    PARQUET_ROW_GROUP linhas e, se a soma dos buffers passar de PARQUET_BUFFER_ROWS (muitas
+    partições pequenas: ~100 distribuidoras no BT), os maiores são gravados até voltar ao teto."""
+    df = chunk.drop(columns=estado["particoes"])
+    fracionarias = [col for col in estado["inteiras"]
+                    if df[col].dtype.kind == 'f' and (df[col] % 1 > 0).any()]
+    if fracionarias:
+        promove_double(estado, sorted(fracionarias))
+    for col in estado["textos"]:
+        s = df[col]
+        cats = s.cat.categories if isinstance(s.dtype, pd.CategoricalDtype) else s
+        if pd.api.types.is_numeric_dtype(cats):
+            # TEXT que a inferência do pandas (TYPED_READ False) leu como número: mesmo texto
+            # que o SQLite guarda na coluna TEXT ('3500008', '123.0')
+            df[col] = s.astype(str).where(s.notna(), None)
+    for col in DATE_FIELDS:
+        if col in df.columns:
+            # texto ISO já convertido por converte_datas → date (date32), um parse por valor distinto
+            df[col] = df[col].map({v: pd.Timestamp(v).date() for v in df[col].dropna().unique()})
+    if estado["particoes"]:
+        chaves = []
+        for c in estado["particoes"]:
+            codigos, valores = pd.factorize(chunk[c].astype(object), use_na_sentinel=False)
+            # nome da pasta calculado uma vez por valor distinto
+            nomes = pd.Index([valor_particao(v, c in DATE_FIELDS) for v in valores], dtype=object)
+            chaves.append(pd.Series(nomes.take(codigos), index=chunk.index))
+        grupos = df.groupby(chaves, sort=False)
+    else:
+        grupos = [((), df)]
+    for chave, parte in grupos:
+        chave = chave if isinstance(chave, tuple) else (chave,)
+        estado["buffers"].setdefault(chave, []).append(parte)
+        estado["linhas"][chave] = estado["linhas"].get(chave, 0) + len(parte)
+        estado["em_buffer"] += len(parte)
+        if estado["linhas"][chave] >= PARQUET_ROW_GROUP:
+            grava_particao(estado, chave)
+    while estado["em_buffer"] > PARQUET_BUFFER_ROWS:
+        grava_particao(estado, max(estado["linhas"], key=estado["linhas"].get))
+
+
+def fecha_parquet(estado: dict):
+    """Grava os buffers restantes e fecha os arquivos."""
+    for chave in list(estado["buffers"]):
+        grava_particao(estado, chave)
+    for writer in estado["writers"].values():
+        writer.close()
+    print(f"   parquet: {len(estado['writers'])} partições em {estado['dir']}")
+
+
+_DECIMAL_TEXTO = re.compile(rf'^([+-]?\d+){re.escape(DECIMAL)}(\d+)$')
+
+
+def normaliza_decimal_texto(chunk: pd.DataFrame, tipo_map: dict):
+    """Colunas TEXT lidas como texto: valores numéricos com DECIMAL ('9922,16') passam a '9922.16',
+    como na inferência do pandas (que os lia como REAL), para SUM/CAST na base continuarem valendo."""
+    for col, t in tipo_map.items():
+        if t != 'TEXT' or col in DATE_FIELDS or col not in chunk.columns:
+            continue
+        s = chunk[col]
+        if pd.api.types.is_numeric_dtype(s) or not s.str.contains(DECIMAL, regex=False).any():
+            continue
+        chunk[col] = s.str.replace(_DECIMAL_TEXTO, r'\1.\2', regex=True)
+
+
+def converte_chunk(chunk: pd.DataFrame, tipo_map: dict, med: dict = None) -> pd.DataFrame:
+    """Aplica conversão de nulos/zeros e datas conforme DDA.
+    Colunas numéricas são tratadas em bloco (um fillna no bloco float64), sem reatribuir
+    coluna a coluna; colunas int64 (inferidas pelo pandas) não têm nulos e ficam como estão."""
+    numericas = [col for col, t in tipo_map.items() if t in ('REAL','INTEGER')]
+    with etapa(med, 'numericos'):
+        # o parser devolve texto (com vírgula decimal) quando a coluna tem valor não numérico
+        # no chunk: to_numeric só nelas, e só o valor inválido vira nulo (→ 0)
+        texto = [col for col in numericas if not pd.api.types.is_numeric_dtype(chunk[col])]
+        for col in texto:
+            chunk[col] = pd.to_numeric(chunk[col].astype(str).str.replace(DECIMAL, '.', regex=False),
+                                       errors='coerce')
+        com_nulos = [col for col in numericas if chunk[col].dtype.kind == 'f']
+        if com_nulos:
+            chunk[com_nulos] = chunk[com_nulos].fillna(0)
+    with etapa(med, 'datas'):
+        for col in DATE_FIELDS:
+            if col in tipo_map and col not in numericas:
+                chunk[col] = converte_datas(chunk[col])
+    with etapa(med, 'textos'):
+        if TYPED_READ or CSV_ENGINE == 'pyarrow':
+            normaliza_decimal_texto(chunk, tipo_map)
+        objetos = [col for col, t in tipo_map.items()
+                   if t == 'TEXT' and col not in DATE_FIELDS and chunk[col].dtype == object]
+        if objetos:
+            chunk[objetos] = chunk[objetos].where(chunk[objetos].notna(), None)
+    return chunk
+
+
+def colunas_categoricas(tp: str, tipo_map: dict, chunk: pd.DataFrame = None) -> dict:
+    """Colunas TEXT a converter em category (nunca chave/datas) → categorias iniciais (vazias).
+    Usa as colunas "distintos"/"linhas"/"nulos" do DDA; sem elas, a cardinalidade do primeiro
+    chunk (chunk None: devolve None, a decisão fica para depois da leitura). Em ambos os casos
+    exige distintos <= CATEGORICAL_MAX_DISTINCT e distintos / linhas não nulas <= CATEGORICAL_MAX_RATIO."""
+    textos = [col for col, t in tipo_map.items()
+              if t == 'TEXT' and col != "COD_ID" and col not in DATE_FIELDS]
+    stats = load_dda_distintos(tp)
+    if not stats:
+        if chunk is None:
+            return None
+        stats = {col: (chunk[col].nunique(), chunk[col].count()) for col in textos}
+    # quase tudo distinto (chaves, nomes, CEP): códigos + categorias custam mais que o texto
+    cols = [col for col in textos if col in stats and stats[col][1] > 0
+            and stats[col][0] <= CATEGORICAL_MAX_DISTINCT
+            and stats[col][0] / stats[col][1] <= CATEGORICAL_MAX_RATIO]
+    print(f"   category: {', '.join(cols) or 'nenhuma coluna'}")
+    return {col: pd.Index([], dtype=object) for col in cols}
+
+
+def categoriza_chunk(chunk: pd.DataFrame, cats: dict) -> pd.DataFrame:
+    """Converte as colunas de cats em category; as categorias só crescem (valores novos ao fim),
+    então o código de cada valor é o mesmo em todos os chunks. Colunas que o leitor já entregou
+    como category (categorias do próprio chunk) só são recodificadas, sem passar por texto."""
+    for col, idx in cats.items():
+        s = chunk[col]
+        lida = isinstance(s.dtype, pd.CategoricalDtype)
+        if lida:
+            valores = pd.Index(s.cat.categories.astype(object), dtype=object)
+        else:
+            s = s.astype(object)
+            valores = pd.Index(s.dropna().unique(), dtype=object)
+        novos = valores.difference(idx, sort=False)
+        if len(novos):
+            idx = cats[col] = idx.append(novos)
+        chunk[col] = s.cat.set_categories(idx) if lida else pd.Categorical(s, categories=idx)
+    return chunk
+
+
+def memoria_como_texto(chunk: pd.DataFrame, cols) -> int:
+    """memory_usage(deep=True) que o chunk teria com as colunas category de cols no dtype de
+    texto do leitor (materializa uma coluna por vez: só para CATEGORICAL_REPORT)."""
+    texto = READ_DTYPE_MAP['TEXT'] if TYPED_READ else str
+    total = chunk.memory_usage(deep=True).sum()
+    for col in cols:
+        s = chunk[col]
+        total += s.astype(texto).memory_usage(deep=True, index=False) - s.memory_usage(deep=True, index=False)
+    return total
+
+
+def leitura_adaptativa(reader, tp: str):
+    """Gera chunks do read_data_chunk ajustando o nº de linhas ao orçamento CHUNK_MEMORY_MB,
+    pelos bytes/linha observados (memory_usage deep, média móvel); cresce no máximo 2x por passo.
+    No modo pipeline a memória fica em até PIPELINE_QUEUE + 2 chunks."""
+    orcamento = CHUNK_MEMORY_MB * 2**20
+    tamanho, bpl = CHUNKSIZE, None
+    tamanhos, linhas, t0 = [], 0, time.perf_counter()
+    with contextlib.closing(reader):
+        pedido = None  # send(None) no gerador novo = primeiro chunk com CHUNKSIZE
+        while True:
+            try:
+                chunk = reader.send(pedido)
+            except StopIteration:
+                break
+            tamanhos.append(len(chunk))
+            linhas += len(chunk)
+            obs = chunk.memory_usage(deep=True).sum() / max(len(chunk), 1)
+            bpl = obs if bpl is None else (bpl + obs) / 2
+            novo = min(max(int(orcamento / bpl), CHUNK_MIN_ROWS), CHUNK_MAX_ROWS, 2 * tamanho)
+            if abs(novo - tamanho) > tamanho // 10:
+                print(f"   chunk {tp}: {tamanho} -> {novo} linhas ({bpl:.0f} bytes/linha)")
+                tamanho = pedido = novo
+            yield chunk
+    dt = time.perf_counter() - t0
+    if tamanhos:
+        print(f"   chunks {tp}: {len(tamanhos)} (min {min(tamanhos)}, máx {max(tamanhos)} linhas), "
+              f"{linhas / dt if dt else 0:,.0f} linhas/s")
+
+
+def chunks_convertidos(tp: str, tipo_map: dict, skip=0):
+    """Lê e converte chunks na mesma thread da gravação.
+    Com INSTRUMENTACAO, cada chunk leva em attrs["medicao"] os tempos de leitura e conversão."""
+    medidor = {} if INSTRUMENTACAO else None
+    # com estatísticas no DDA, as colunas category já saem do parser assim: o chunk nunca
+    # existe inteiro como texto (sem elas, converte depois de ler o primeiro chunk)
+    cats = colunas_categoricas(tp, tipo_map) if CATEGORICAL_TEXT else None
+    categoricas = list(cats or ())
+    if CSV_ENGINE == 'pyarrow':
+        reader = read_data_batches(tp, FILES[tp], tipo_map, skip=skip, medidor=medidor,
+                                   categoricas=categoricas)
+    else:
+        dtype = read_dtypes(tipo_map) if TYPED_READ else {}
+        dtype = {**dtype, **{col: 'category' for col in categoricas}} or None
+        reader = read_data_chunk(tp, FILES[tp], CHUNKSIZE, dtype=dtype, skip=skip, medidor=medidor)
+        if CHUNK_MEMORY_MB:
+            reader = leitura_adaptativa(reader, tp)
+    mem = []
+    lidos, t_arquivo, t_fim = 0, 0.0, time.perf_counter()
+    # fecha os arquivos também quando a carga é interrompida (no Windows o handle aberto bloqueia o arquivo)
+    with contextlib.closing(reader):
+        for n, chunk in enumerate(reader, 1):
+            med = None
+            if medidor is not None:
+                # leitura = desde a devolução do chunk anterior; "arquivo" é a parte em read()
+                # (disco/descompressão), o restante é o parser
+                arq = medidor.get("arquivo")
+                b, ta = (arq.bytes, arq.tempo) if arq else (0, 0.0)
+                leitura = time.perf_counter() - t_fim
+                med = {"arquivo": ta - t_arquivo, "parser": leitura - (ta - t_arquivo), "bytes": b - lidos}
+                lidos, t_arquivo = b, ta
+            chunk = converte_chunk(chunk, tipo_map, med)
+            if CATEGORICAL_TEXT:
+                if cats is None:
+                    cats = colunas_categoricas(tp, tipo_map, chunk)
+                with etapa(med, 'categorias'):
+                    chunk = categoriza_chunk(chunk, cats)
+                antes = memoria_como_texto(chunk, cats) if CATEGORICAL_REPORT else 0
+                if CATEGORICAL_REPORT:
+                    depois = chunk.memory_usage(deep=True).sum()
+                    mem.append((antes, depois))
+                    print(f"   chunk {n}: {antes / 2**20:.1f} MB -> {depois / 2**20:.1f} MB")
+            if med is not None:
+                chunk.attrs["medicao"] = med
+            yield chunk
+            t_fim = time.perf_counter()
+    if mem:
+        antes, depois = (sum(m) / len(mem) / 2**20 for m in zip(*mem))
+        print(f"   memória média por chunk ({tp}): {antes:.1f} MB -> {depois:.1f} MB "
+              f"({100 * (1 - depois / antes):.0f}% menos)")
+
+
+_FIM = object()  # sentinela de fim da fila do pipeline
+
+
+def chunks_pipeline(tp: str, tipo_map: dict, skip=0):
+    """Lê e converte chunks numa thread produtora; a fila limitada (PIPELINE_QUEUE)
+    bloqueia o produtor quando a gravação atrasa, mantendo a memória sob controle."""
+    fila = queue.Queue(maxsize=PIPELINE_QUEUE)
+    parar = threading.Event()
+
+    def put(item):
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produtor():
+        try:
+            for chunk in chunks_convertidos(tp, tipo_map, skip=skip):
+                if not put(chunk):
+                    return
+            put(_FIM)
+        except BaseException as e:  # repassado ao consumidor
+            put(e)
+
+    th = threading.Thread(target=produtor, name=f"parser-{tp}", daemon=True)
+    th.start()
+    try:
+        while True:
+            item = fila.get()
+            if item is _FIM:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        # consumidor encerrou (fim, erro ou abandono): libera o produtor
+        parar.set()
+        th.join()
+
+
+CHECKPOINT_DDL = """
+CREATE TABLE IF NOT EXISTS controle_importacao (
+    tabela     TEXT PRIMARY KEY,
+    chunks     INTEGER NOT NULL,
+    linhas     INTEGER NOT NULL,
+    concluido  INTEGER NOT NULL DEFAULT 0,
+    atualizado TEXT
+)"""
+# estilo :nome serve tanto ao sqlite3 (executemany) quanto ao text() do SQLAlchemy (to_sql)
+CHECKPOINT_UPSERT = """
+INSERT INTO controle_importacao (tabela, chunks, linhas, concluido, atualizado)
+VALUES (:tabela, :chunks, :linhas, :concluido, datetime('now'))
+ON CONFLICT(tabela) DO UPDATE SET chunks = excluded.chunks, linhas = excluded.linhas,
+    concluido = excluded.concluido, atualizado = excluded.atualizado"""
+
+
+def le_checkpoint(engine, table: str):
+    """Retorna (chunks, linhas, concluido) já gravados para a tabela, ou (0, 0, False)."""
+    with engine.begin() as con:
+        con.execute(text(CHECKPOINT_DDL))
+        row = con.execute(text("SELECT chunks, linhas, concluido FROM controle_importacao WHERE tabela = :t"),
+                          {"t": table}).fetchone()
+    return (row[0], row[1], bool(row[2])) if row else (0, 0, False)
+
+
+def importa_tipo(tp: str, engine, table: str = None):
     print(f"Importando tipo {tp}...")
     # carregar DDA
     tipo_map = load_dda(tp)
     # preparar dtype para to_sql
     dtype_map = {col: SQL_TYPE_MAP[tipo_map[col]]()
                  for col in tipo_map}
+    if DATE_AS_ISO_DATE:
+        dtype_map.update({col: DATE_ISO() for col in DATE_FIELDS if col in dtype_map})
+    cods = colunas_dicionario(tp, tipo_map) if table is None else []
+    if cods:
+        dtype_map.update({col: types.INTEGER() for col in cods})
+        print(f"   codificação por dicionário: {', '.join(cods)}")
+    table = table or (f'uc_{tp}_pj_cod' if cods else f'uc_{tp}_pj')
 
-    # read chunks
-    reader = read_data_chunk(tp, FILES[tp], CHUNKSIZE)
-    first = True
-    batch = 0
-    for chunk in reader:
-        batch += 1
-        # aplicar conversão de nulos/zeros e datas
-        for col, t in tipo_map.items():
-            if t in ('REAL','INTEGER'):
-                chunk[col] = pd.to_numeric(chunk[col], errors='coerce').fillna(0)
-            elif col in DATE_FIELDS:
-                chunk[col] = chunk[col].apply(parse_date)
-            else:
-                chunk[col] = chunk[col].where(chunk[col].notna(), None)
-        # inserir
+    # checkpoint: retomar de onde a última carga parou (controle_importacao só existe com RESUME_IMPORT)
+    batch, rows, concluido = le_checkpoint(engine, table) if RESUME_IMPORT else (0, 0, False)
+    if concluido:
+        print(f"-> {tp} já concluído anteriormente ({rows} linhas), pulando.")
+        return rows
+    if rows:
+        print(f"   retomando após {batch} batches ({rows} linhas) já gravados")
+    first = rows == 0
+    mensal = colunas_mensais(tipo_map) if MONTHLY_TABLE and "COD_ID" in tipo_map else {}
+    if mensal:
+        prepara_mensal(engine, tp, limpar=first)
+    grupos = grupos_metricas(tipo_map) if ROLLUPS else None
+    retomado = not first
+    acc = {}
+    dics = prepara_dicionarios(engine, tp, cods, limpar=first) if cods else {}
+    parquet = None
+    if PARQUET_EXPORT:
         if first:
-            chunk.to_sql(f'uc_{tp}_pj', engine, if_exists='replace', index=False, dtype=dtype_map)
-            first = False
+            parquet = prepara_parquet(tp, tipo_map)
         else:
-            chunk.to_sql(f'uc_{tp}_pj', engine, if_exists='append', index=False)
-        # limpar
-        del chunk; gc.collect()
-    print(f"-> {tp} concluído, {batch} batches importados.")
+            # o arquivo interrompido não tem rodapé e não pode ser continuado
+            print(f"[AVISO] carga de {tp} retomada: exportação Parquet ignorada (refaça a carga completa)")
+
+    # read chunks
+    if IMPORT_MODE == 'pipeline':
+        chunks = chunks_pipeline(tp, tipo_map, skip=rows)
+    else:
+        chunks = chunks_convertidos(tp, tipo_map, skip=rows)
+    ckpt = {"tabela": table, "chunks": batch, "linhas": rows, "concluido": 0} if RESUME_IMPORT else None
+    raw = None
+    saida = open(INSTRUMENTACAO_PATH, 'a', encoding='utf-8') if INSTRUMENTACAO else None
+    resumo, t_parede = {}, time.perf_counter()
+    try:
+        for chunk in chunks:
+            # medição da leitura/conversão (feita na thread produtora no modo pipeline)
+            med = chunk.attrs.pop("medicao", None)
+            n = len(chunk)
+            batch += 1
+            rows += n
+            if ckpt:
+                ckpt.update(chunks=batch, linhas=rows)
+            gravar, novos = chunk, {}
+            if dics:
+                with etapa(med, 'dicionario'):
+                    gravar, novos = codifica_chunk(chunk, dics)
+            longo = None
+            if mensal:
+                with etapa(med, 'mensal'):
+                    longo = chunk_mensal(chunk, tp, mensal)
+            # inserir (dados e checkpoint na mesma transação)
+            with etapa(med, 'gravacao'):
+                if LOAD_ENGINE == 'executemany':
+                    if first:
+                        # schema criado pelo próprio to_sql (tabela vazia) → DDL idêntico ao caminho padrão
+                        gravar.head(0).to_sql(table, engine, if_exists='replace', index=False, dtype=dtype_map)
+                        first = False
+                    if raw is None:
+                        raw = engine.raw_connection()
+                        cur = raw.cursor()
+                        sql = insert_sql(table, chunk.columns)
+                        cur.execute("BEGIN")
+                    cur.executemany(sql, chunk_rows(gravar))
+                    for col, df in novos.items():
+                        insere(cur, tabela_dic(tp, col), df)
+                    if mensal:
+                        insere(cur, MONTHLY_TABLE_NAME, longo)
+                    if batch % TXN_CHUNKS == 0:
+                        if ckpt:
+                            cur.execute(CHECKPOINT_UPSERT, ckpt)
+                        raw.commit()
+                        cur.execute("BEGIN")
+                else:
+                    with engine.begin() as con:
+                        if first:
+                            gravar.to_sql(table, con, if_exists='replace', index=False, dtype=dtype_map)
+                            first = False
+                        else:
+                            gravar.to_sql(table, con, if_exists='append', index=False)
+                        for col, df in novos.items():
+                            insere(con, tabela_dic(tp, col), df)
+                        if mensal:
+                            insere(con, MONTHLY_TABLE_NAME, longo)
+                        if ckpt:
+                            con.execute(text(CHECKPOINT_UPSERT), ckpt)
+            if ROLLUPS and not retomado:
+                with etapa(med, 'rollups'):
+                    acumula_rollups(acc, chunk, grupos)
+            if parquet:
+                with etapa(med, 'parquet'):
+                    exporta_parquet(parquet, chunk)
+            # GC completo só a cada GC_INTERVAL chunks (por chunk custava mais que a conversão)
+            del chunk, gravar, longo
+            if GC_INTERVAL and batch % GC_INTERVAL == 0:
+                with etapa(med, 'gc'):
+                    gc.collect()
+            if saida:
+                registra_chunk(saida, tp, batch, n, med, resumo)
+        # fim: marca concluído junto com o último lote
+        if parquet:
+            fecha_parquet(parquet)
+        if raw is not None:
+            if ckpt:
+                ckpt["concluido"] = 1
+                cur.execute(CHECKPOINT_UPSERT, ckpt)
+            raw.commit()
+        elif ckpt:
+            ckpt["concluido"] = 1
+            with engine.begin() as con:
+                con.execute(text(CHECKPOINT_UPSERT), ckpt)
+    finally:
+        chunks.close()  # encerra a thread produtora em caso de erro na gravação
+        if raw is not None:
+            raw.close()
+        if saida:
+            saida.close()
+    if saida:
+        resumo_instrumentacao(tp, resumo, time.perf_counter() - t_parede)
+    if cods:
+        cria_view_dicionario(engine, tp, list(tipo_map), cods)
+    if ROLLUPS:
+        grava_rollups(engine, tp, rollups_da_tabela(engine, f'uc_{tp}_pj', tipo_map) if retomado else acc)
+    print(f"-> {tp} concluído, {batch} batches importados ({rows} linhas).")
+    return rows
+
+
+DELTA_DDL = """
+CREATE TABLE IF NOT EXISTS controle_delta (
+    tabela     TEXT NOT NULL,
+    data_base  TEXT,
+    inseridos  INTEGER NOT NULL,
+    alterados  INTEGER NOT NULL,
+    removidos  INTEGER NOT NULL,
+    aplicado   TEXT NOT NULL
+)"""
+
+
+def colunas_tabela(cur, table: str):
+    return [r[1] for r in cur.execute(f'PRAGMA table_info("{table}")').fetchall()]
+
+
+def chaves_delta(cols) -> list:
+    """Colunas de DELTA_KEY presentes na tabela (COD_ID sempre)."""
+    return [c for c in DELTA_KEY if c in cols] or ["COD_ID"]
+
+
+def indice_chave(cur, table: str, chaves: list):
+    """Índice único na chave do delta: exigido pelo ON CONFLICT do upsert."""
+    lista = ", ".join(f'"{c}"' for c in chaves)
+    cur.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS "ux_{table}_{"_".join(chaves)}" ON "{table}" ({lista})')
+
+
+def aplica_delta(engine, tp: str, stage: str):
+    """Aplica o snapshot carregado em stage sobre uc_{tp}_pj pela chave DELTA_KEY: inclui UCs novas,
+    atualiza as alteradas e remove as ausentes, guardando as versões anteriores (com seu
+    DATA_BASE) em uc_{tp}_pj_hist. Só as linhas que mudaram são escritas na tabela principal."""
+    table, hist = f'uc_{tp}_pj', f'uc_{tp}_pj_hist'
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cols = colunas_tabela(cur, table)
+        chaves = chaves_delta(cols)
+        lista_chaves = ", ".join(f'"{c}"' for c in chaves)
+        # DATA_BASE muda em todo snapshot: não conta como alteração da UC
+        comparar = [c for c in cols if c not in chaves and c not in DATE_FIELDS]
+        lista = ", ".join(f'"{c}"' for c in cols)
+        mesma_uc = " AND ".join(f'm."{c}" = s."{c}"' for c in chaves)
+        difere = " OR ".join(f'm."{c}" IS NOT s."{c}"' for c in comparar) or "0"
+        sets = ", ".join(f'"{c}" = excluded."{c}"' for c in cols if c not in chaves)
+
+        cur.execute(f'CREATE INDEX IF NOT EXISTS "ix_{stage}_{"_".join(chaves)}" ON "{stage}" ({lista_chaves})')
+        indice_chave(cur, table, chaves)
+        cur.execute(f'CREATE TABLE IF NOT EXISTS "{hist}" AS SELECT *, \'\' AS hist_operacao, '
+                    f'\'\' AS hist_data FROM "{table}" WHERE 0')
+        cur.execute(DELTA_DDL)
+        cur.execute("BEGIN")
+        # chaves alteradas e novas
+        cur.execute("DROP TABLE IF EXISTS temp.delta_alt")
+        sel_chaves = ", ".join(f's."{c}"' for c in chaves)
+        cur.execute(f'CREATE TEMP TABLE delta_alt AS SELECT {sel_chaves} '
+                    f'FROM "{stage}" s JOIN "{table}" m ON {mesma_uc} WHERE {difere}')
+        alterados = cur.execute("SELECT COUNT(*) FROM temp.delta_alt").fetchone()[0]
+        novo = f'NOT EXISTS (SELECT 1 FROM "{table}" m WHERE {mesma_uc})'
+        inseridos = cur.execute(f'SELECT COUNT(*) FROM "{stage}" s WHERE {novo}').fetchone()[0]
+        # histórico: versões substituídas e UCs removidas
+        alterada = f'({lista_chaves}) IN (SELECT {lista_chaves} FROM temp.delta_alt)'
+        cur.execute(f'INSERT INTO "{hist}" SELECT m.*, \'alterado\', datetime(\'now\') FROM "{table}" m '
+                    f'WHERE {alterada}')
+        ausente = f'NOT EXISTS (SELECT 1 FROM "{stage}" s WHERE {mesma_uc})'
+        cur.execute(f'INSERT INTO "{hist}" SELECT m.*, \'removido\', datetime(\'now\') FROM "{table}" m '
+                    f'WHERE {ausente}')
+        removidos = cur.execute(f'DELETE FROM "{table}" AS m WHERE {ausente}').rowcount
+        # upsert só das novas e alteradas
+        cur.execute(f'INSERT INTO "{table}" ({lista}) SELECT {lista} FROM "{stage}" s '
+                    f'WHERE {alterada} OR {novo} '
+                    f'ON CONFLICT({lista_chaves}) DO UPDATE SET {sets}')
+        data_base = cur.execute(f'SELECT MAX("{DATE_FIELDS[0]}") FROM "{stage}"').fetchone()[0] \
+            if DATE_FIELDS and DATE_FIELDS[0] in cols else None
+        cur.execute("INSERT INTO controle_delta VALUES (?, ?, ?, ?, ?, datetime('now'))",
+                    (table, data_base, inseridos, alterados, removidos))
+        raw.commit()
+        cur.execute(f'DROP TABLE "{stage}"')
+        if RESUME_IMPORT:
+            cur.execute("DELETE FROM controle_importacao WHERE tabela = ?", (stage,))
+        raw.commit()
+        cur.close()
+    finally:
+        raw.close()
+    print(f"-> delta {tp} ({data_base}): {inseridos} inseridas, {alterados} alteradas, {removidos} removidas")
+    return inseridos, alterados, removidos
+
+
+def importa_delta(tp: str, engine):
+    """Modo DELTA_IMPORT: primeira carga direto na tabela; depois staging + aplica_delta."""
+    table = f'uc_{tp}_pj'
+    with engine.connect() as con:
+        existe = con.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :t"),
+                             {"t": table}).fetchone()
+    if existe is None:
+        rows = importa_tipo(tp, engine)
+        raw = engine.raw_connection()
+        try:
+            cur = raw.cursor()
+            # UPSERT do próximo snapshot exige índice único na chave
+            indice_chave(cur, table, chaves_delta(colunas_tabela(cur, table)))
+            raw.commit()
+            cur.close()
+        finally:
+            raw.close()
+    else:
+        rows = importa_tipo(tp, engine, table=f'{table}_stage')
+        aplica_delta(engine, tp, f'{table}_stage')
+    return rows
+
+
+def nome_indice(table: str, ix: dict) -> str:
+    return ix.get("nome") or f"ix_{table}_{'_'.join(ix['colunas'])}"
+
+
+def cria_indices(engine, spec: dict = None):
+    """Cria os índices de INDEX_SPEC nas tabelas existentes; retorna [(tabela, índice, segundos)]."""
+    spec = INDEX_SPEC if spec is None else spec
+    tempos = []
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        for nome_spec, indices in spec.items():
+            table = tabela_fisica(cur, nome_spec)
+            cols_tab = set(colunas_tabela(cur, table))
+            if not cols_tab:
+                continue  # tabela não importada
+            for ix in indices:
+                cols = ix["colunas"]
+                faltam = [c for c in cols if c not in cols_tab]
+                if faltam:
+                    print(f"[AVISO] índice em {table}({', '.join(cols)}) ignorado: faltam {faltam}")
+                    continue
+                nome = nome_indice(table, ix)
+                lista = ", ".join(f'"{c}"' for c in cols)
+                unique = "UNIQUE " if ix.get("unique") else ""
+                sql = f'CREATE {unique}INDEX IF NOT EXISTS "{nome}" ON "{table}" ({lista})'
+                if ix.get("where"):
+                    sql += f' WHERE {ix["where"]}'
+                t0 = time.perf_counter()
+                cur.execute(sql)
+                raw.commit()
+                dt = time.perf_counter() - t0
+                tempos.append((table, nome, dt))
+                print(f"   índice {nome}: {dt:.1f}s")
+        cur.close()
+    finally:
+        raw.close()
+    return tempos
+
+
+def cria_rtree(engine, tp: str):
+    """Cria uc_{tp}_pj_rtree(id = rowid, caixa, +COD_ID, +x, +y) com as UCs de coordenada válida.
+    A caixa é float32; x/y auxiliares guardam a coordenada exata (double) para os filtros.
+    Criada depois do VACUUM (que pode renumerar o rowid); consultas usam só COD_ID/x/y."""
+    table = f'uc_{tp}_pj'
+    rt = f'{table}_rtree'
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        table = tabela_fisica(cur, table)
+        cols = {c.upper(): c for c in colunas_tabela(cur, table)}
+        if not {"POINT_X", "POINT_Y", "COD_ID"} <= set(cols):
+            print(f"[AVISO] {table} sem POINT_X/POINT_Y/COD_ID, R*Tree não criada")
+            return 0
+        x, y, cod = cols["POINT_X"], cols["POINT_Y"], cols["COD_ID"]
+        t0 = time.perf_counter()
+        try:
+            cur.execute(f'DROP TABLE IF EXISTS "{rt}"')
+            cur.execute(f'CREATE VIRTUAL TABLE "{rt}" USING rtree(id, min_x, max_x, min_y, max_y, +COD_ID, +x, +y)')
+        except sqlite3.OperationalError as e:
+            print(f"[AVISO] SQLite sem módulo rtree ({e}), índice espacial não criado")
+            return 0
+        # coordenada nula vira 0 na conversão: (0, 0) não é posição real
+        n = cur.execute(f'INSERT INTO "{rt}" SELECT rowid, "{x}", "{x}", "{y}", "{y}", "{cod}", "{x}", "{y}" '
+                        f'FROM "{table}" '
+                        f'WHERE "{x}" IS NOT NULL AND "{y}" IS NOT NULL AND NOT ("{x}" = 0 AND "{y}" = 0)').rowcount
+        raw.commit()
+        cur.close()
+        print(f"   R*Tree {rt}: {n} UCs em {time.perf_counter() - t0:.1f}s")
+        return n
+    finally:
+        raw.close()
+
+
+def shard_path(tp: str) -> Path:
+    """Arquivo SQLite temporário do tipo no modo PARALLEL_SHARDS."""
+    return OUTPUT_DIR / f"{DB_PATH.stem}_{tp}{DB_PATH.suffix}"
+
+
+def config_processo() -> dict:
+    """Configurações do módulo (nomes em maiúsculas) a repassar aos processos dos shards."""
+    return {k: v for k, v in globals().items() if k.isupper()}
+
+
+def aplica_config(config: dict):
+    """initializer dos processos dos shards: com spawn (único método no Windows) o filho reimporta
+    o módulo e voltaria aos caminhos e flags fixos do topo do arquivo, perdendo os ajustes feitos em
+    tempo de execução (BenchmarkPJ, testes)."""
+    globals().update(config)
+
+
+def importa_shard(tp: str, path: Path):
+    """Importa um tipo na base path (executado em processo separado)."""
+    if path.exists() and not RESUME_IMPORT:
+        path.unlink()
+    engine = create_engine(f'sqlite:///{path}')
+    if IMPORT_PROFILE:
+        event.listen(engine, "connect", _pragmas_import_on_connect)
+    t0 = time.perf_counter()
+    rows = importa_tipo(tp, engine)
+    engine.dispose()
+    return tp, time.perf_counter() - t0, rows
+
+
+def mescla_shards(engine, tipos):
+    """Anexa cada shard e copia suas tabelas (UC, dicionários, resumos, tabela mensal), views e índices
+    para a base principal com o mesmo DDL. A tabela mensal é compartilhada: recebe só as linhas do tipo."""
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        for tp in tipos:
+            t0 = time.perf_counter()
+            cur.execute("ATTACH DATABASE ? AS shard", (str(shard_path(tp)),))
+            objetos = cur.execute("SELECT type, name, sql FROM shard.sqlite_master "
+                                  "WHERE type IN ('table', 'view', 'index') AND sql IS NOT NULL "
+                                  "AND name NOT LIKE 'sqlite_%' AND tbl_name <> 'controle_importacao' "
+                                  "ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'view' THEN 1 ELSE 2 END"
+                                  ).fetchall()
+            for tipo, nome, ddl in objetos:
+                if nome == MONTHLY_TABLE_NAME:
+                    cur.execute(ddl.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1))
+                    cur.execute(f'DELETE FROM main."{nome}" WHERE "tipo" = ?', (tp,))
+                else:
+                    existente = cur.execute("SELECT type FROM main.sqlite_master WHERE name = ?",
+                                            (nome,)).fetchone()
+                    if existente:
+                        cur.execute(f'DROP {existente[0].upper()} main."{nome}"')
+                    cur.execute(ddl)
+                if tipo == 'table':
+                    cur.execute(f'INSERT INTO main."{nome}" SELECT * FROM shard."{nome}"')
+            raw.commit()
+            cur.execute("DETACH DATABASE shard")
+            shard_path(tp).unlink()
+            print(f"-> shard {tp} mesclado em {time.perf_counter() - t0:.1f}s")
+        cur.close()
+    finally:
+        raw.close()
+
+
+def importa_paralelo(engine, tipos):
+    """Importa os tipos em paralelo (um processo por tipo) e mescla em DB_PATH."""
+    tempos = {}
+    with ProcessPoolExecutor(max_workers=len(tipos), initializer=aplica_config,
+                             initargs=(config_processo(),)) as pool:
+        for tp, dt, rows in pool.map(importa_shard, tipos, [shard_path(tp) for tp in tipos]):
+            tempos[tp] = dt
+    t0 = time.perf_counter()
+    mescla_shards(engine, tipos)
+    tempos['merge'] = time.perf_counter() - t0
+    return tempos
+
+
+def importa(engine) -> dict:
+    """Carga completa (AT, MT, BT) com perfil de importação, R*Tree e índices conforme a
+    configuração; devolve os tempos por etapa (s), com 'total' do início ao fim (ANALYZE/VACUUM inclusos)."""
+    if IMPORT_PROFILE:
+        ativa_perfil_importacao(engine)
+    # importar AT, MT, BT
+    t_total = time.perf_counter()
+    if PARALLEL_SHARDS and not DELTA_IMPORT:
+        tempos = importa_paralelo(engine, ('at','mt','bt'))
+    else:
+        tempos = {}
+        for tp in ('at','mt','bt'):
+            t0 = time.perf_counter()
+            if DELTA_IMPORT:
+                importa_delta(tp, engine)
+            else:
+                importa_tipo(tp, engine)
+            tempos[tp] = time.perf_counter() - t0
+    if BUILD_INDEXES:
+        t0 = time.perf_counter()
+        cria_indices(engine)
+        tempos['indices'] = time.perf_counter() - t0
+    if IMPORT_PROFILE:
+        t0 = time.perf_counter()
+        finaliza_perfil_importacao(engine)
+        tempos['analyze_vacuum'] = time.perf_counter() - t0
+    # depois do VACUUM: o id da R*Tree é o rowid da tabela
+    if SPATIAL_INDEX:
+        t0 = time.perf_counter()
+        for tp in ('at','mt','bt'):
+            cria_rtree(engine, tp)
+        tempos['rtree'] = time.perf_counter() - t0
+    # custo completo da carga: inclui ANALYZE/VACUUM e R*Tree
+    tempos['total'] = time.perf_counter() - t_total
+    return tempos
 
 
 if __name__ == '__main__':
     verify_files()
     # recriar DB se necessário
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    if RECREATE_DB and DB_PATH.exists():
+    if RECREATE_DB and not RESUME_IMPORT and not DELTA_IMPORT and DB_PATH.exists():
         DB_PATH.unlink()
     # criar engine
     engine = create_engine(f'sqlite:///{DB_PATH}')
-    # importar AT, MT, BT
-    for tp in ('at','mt','bt'):
-        importa_tipo(tp)
-    print("Importação completa. DB em:", DB_PATH)
\ No newline at end of file
+    tempos = importa(engine)
+    resumo_tempos(tempos, 'importacao' if IMPORT_PROFILE else 'padrao')
+    print("Importação completa. DB em:", DB_PATH)
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script: GeraDadosSinteticosPJ.py
+Descrição: Gera arquivos sintéticos de UC PJ no formato dos extratos ANEEL (ucat_pj.csv, ucmt_pj.csv e
+           ucbt_pj.zip): latin1, separador ';', vírgula decimal, DATA_BASE '31DEC2023:00:00:00.0000000',
+           colunas mensais ENE/DEM/DIC/FIC, coordenadas e nulos. Gravação em blocos (memória constante),
+           para benchmarks de até dezenas de milhões de linhas.
+           Por padrão grava em INPUT_DIR do Compara3PJ, com os nomes de FILES: Compara3PJ e
+           CriaePopulaSQLitePJ rodam sobre a saída sem alteração.
+           Uso: python GeraDadosSinteticosPJ.py [--at N] [--mt N] [--bt N] [--dir DIR] [--semente S]
+Data: 2026-10-15
+Programador: Ivo Cyrillo
+"""
+
+import argparse
+import io
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import Compara3PJ as c3
+
+# === Configurações ===
+LINHAS        = {"at": 5_000, "mt": 100_000, "bt": 1_000_000}  # padrão por tipo (--at/--mt/--bt)
+LINHAS_MAX    = 50_000_000
+BLOCO         = 200_000  # linhas geradas e gravadas por vez
+ZIP_NIVEL     = 1  # compressão do ZIP do BT (1 = rápida; o deflate domina o tempo de geração)
+SEMENTE       = 42
+DISTRIBUIDORAS = [390, 404, 5697]  # códigos DIST
+BASES         = ["31DEC2023:00:00:00.0000000"]  # DATA_BASE (uma base por linha, sorteada)
+SUBESTACOES   = 200  # por distribuidora
+CTMT_POR_SUB  = 12  # alimentadores por subestação
+PROP_NULOS    = 0.01  # fração de células mensais vazias
+PROP_GD       = 0.03  # fração de UCs com geração distribuída (CEG_GD preenchido)
+
+# Perfil por tipo: energia mensal média (kWh, lognormal), tensão e grupos tarifários
+PERFIS = {
+    "at": {"ene": 2_000_000, "ten": ["69kV", "88kV", "138kV"], "gru": ["A1", "A2", "A3"], "dem_pf": True},
+    "mt": {"ene": 60_000, "ten": ["13,8kV", "23kV", "34,5kV"], "gru": ["A3a", "A4", "AS"], "dem_pf": True},
+    "bt": {"ene": 900, "ten": ["127V", "220V", "380V"], "gru": ["B3", "B2", "B4"], "dem_pf": False},
+}
+CLASSES = ["CO1", "CO2", "CO3", "IN", "PP1", "PP2", "SP1", "RU1"]
+CNAES   = ["4711302", "4120400", "8411600", "5611201", "1091101", "4930202", "8630501", None]
+FASES   = ["A", "AB", "ABC", "ABN", "ABCN"]
+SITUACOES = ["AT", "AT", "AT", "AT", "AT", "AT", "AT", "AT", "AT", "DS"]  # ~10% desligadas (consumo zero)
+# nomes acentuados: exercitam a decodificação latin1 dos leitores (pandas e pyarrow)
+MUNICIPIOS = ["SÃO PAULO", "BELÉM", "GOIÂNIA", "MACEIÓ", "VITÓRIA", "FLORIANÓPOLIS", "JOÃO PESSOA",
+              "SÃO LUÍS", "CUIABÁ", "MARABÁ", "ITAJAÍ", "PARANAGUÁ", "ARAÇATUBA", "CAMAÇARI", "GUARUJÁ",
+              "JACAREÍ", "MOGI GUAÇU", "SÃO JOSÉ DOS CAMPOS", "RIBEIRÃO PRETO", "CRICIÚMA", "CAXIAS DO SUL",
+              "CAMPINAS", "LONDRINA", "JUNDIAÍ", "PIRACICABA", "ANÁPOLIS", "IMPERATRIZ", "SANTARÉM"]
+BAIRROS = ["CENTRO", "JARDIM SÃO JOSÉ", "VILA CONCEIÇÃO", "SANTA CECÍLIA", "BOA VISTA", "JARDIM PAULISTÂNIA",
+           "CAMPO BELO", "IPIRANGA", "PARQUE SÃO JORGE", "JAÇANÃ", "TATUAPÉ", "JABAQUARA", "DISTRITO INDUSTRIAL",
+           "VILA SÉSAMO", "JARDIM AMÉRICA", "CONSOLAÇÃO", "BRÁS", "CAMBUÍ", "BOQUEIRÃO", "ÁGUA VERDE"]
+MESES   = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+
+
+def colunas(tp: str) -> list:
+    """Layout do arquivo do tipo (AT/MT com demanda na ponta e fora de ponta)."""
+    meses = [f"{m:02d}" for m in range(1, 13)]
+    dem = ([f"DEM_P_{m}" for m in meses] + [f"DEM_F_{m}" for m in meses]
+           if PERFIS[tp]["dem_pf"] else [f"DEM_{m}" for m in meses])
+    return (["DIST", "COD_ID", "PAC", "CTMT", "SUB", "CONJ", "MUN", "BRR", "CEP", "CLAS_SUB", "CNAE",
+             "FAS_CON", "GRU_TEN", "TEN_FORN", "GRU_TAR", "SIT_ATIV", "DAT_CON", "CAR_INST", "ARE_LOC", "CEG_GD"]
+            + [f"ENE_{m}" for m in meses] + dem + [f"DIC_{m}" for m in meses] + [f"FIC_{m}" for m in meses]
+            + ["POINT_X", "POINT_Y", "DATA_BASE"])
+
+
+def topologia(rng: np.random.Generator) -> dict:
+    """Subestações (código, município, centro geográfico) e alimentadores de cada distribuidora."""
+    n = len(DISTRIBUIDORAS) * SUBESTACOES
+    dist = np.repeat(DISTRIBUIDORAS, SUBESTACOES)
+    sub = np.array([f"{d}-SE{i:04d}" for d, i in zip(dist, np.tile(np.arange(SUBESTACOES), len(DISTRIBUIDORAS)))],
+                   dtype=object)
+    # cada distribuidora numa região (centro sorteado no território), subestações em volta
+    centro = {d: (rng.uniform(-53, -38), rng.uniform(-30, -3)) for d in DISTRIBUIDORAS}
+    lon = np.array([centro[d][0] for d in dist]) + rng.normal(0, 1.0, n)
+    lat = np.array([centro[d][1] for d in dist]) + rng.normal(0, 1.0, n)
+    mun = rng.choice(np.array(MUNICIPIOS, dtype=object), n)
+    ctmt = np.array([f"{s}-AL{k:02d}" for s in sub for k in range(CTMT_POR_SUB)], dtype=object)
+    return {"dist": dist, "sub": sub, "lon": lon, "lat": lat, "mun": mun, "ctmt": ctmt,
+            "conj": np.array([f"{d}{i // 10:03d}" for d, i in
+                              zip(dist, np.tile(np.arange(SUBESTACOES), len(DISTRIBUIDORAS)))], dtype=object)}
+
+
+def data_aneel(dias: np.ndarray) -> np.ndarray:
+    """Datas (dias desde 1970) no formato '31DEC2023:00:00:00.0000000' (formata cada dia distinto uma vez)."""
+    unicos, pos = np.unique(dias, return_inverse=True)
+    d = pd.to_datetime(unicos, unit="D")
+    txt = (d.strftime("%d") + pd.Index(MESES).take(d.month - 1) + d.strftime("%Y")
+           + ":00:00:00.0000000").to_numpy(dtype=object)
+    return txt[pos]
+
+
+def bloco(tp: str, ini: int, n: int, topo: dict, rng: np.random.Generator) -> pd.DataFrame:
+    """Gera n UCs do tipo a partir da linha ini (COD_ID únicos e crescentes)."""
+    perfil = PERFIS[tp]
+    ise = rng.integers(0, len(topo["sub"]), n)
+    ial = ise * CTMT_POR_SUB + rng.integers(0, CTMT_POR_SUB, n)
+    cod = pd.Series(np.arange(ini, ini + n)).astype(str).str.zfill(10)
+    df = {
+        "DIST": topo["dist"][ise],
+        "COD_ID": (f"UC{tp.upper()}" + cod).to_numpy(),
+        "PAC": ("PAC" + cod).to_numpy(),
+        "CTMT": topo["ctmt"][ial],
+        "SUB": topo["sub"][ise],
+        "CONJ": topo["conj"][ise],
+        "MUN": topo["mun"][ise],
+        "BRR": np.where(rng.random(n) < 0.05, None, rng.choice(np.array(BAIRROS, dtype=object), n)),
+        "CEP": rng.integers(10_000_000, 99_999_999, n).astype(str),
+        "CLAS_SUB": rng.choice(CLASSES, n),
+        "CNAE": rng.choice(np.array(CNAES, dtype=object), n),
+        "FAS_CON": rng.choice(FASES, n),
+        "GRU_TEN": "AT" if tp == "at" else ("MT" if tp == "mt" else "BT"),
+        "TEN_FORN": rng.choice(perfil["ten"], n),
+        "GRU_TAR": rng.choice(perfil["gru"], n, p=[0.6, 0.3, 0.1]),
+        "SIT_ATIV": rng.choice(SITUACOES, n),
+        "DAT_CON": data_aneel(rng.integers(0, 19_700, n)),
+        "CAR_INST": np.round(rng.lognormal(np.log(perfil["ene"] / 200), 0.8, n), 2),
+        "ARE_LOC": rng.choice(["UR", "NU"], n, p=[0.85, 0.15]),
+        "CEG_GD": np.where(rng.random(n) < PROP_GD,
+                           np.char.add("GD.BR.", rng.integers(0, 999_999, n).astype(str)), None),
+    }
+    df = pd.DataFrame(df)
+    # consumo mensal: base lognormal por UC x sazonalidade; desligadas com zero
+    base = rng.lognormal(np.log(perfil["ene"]), 1.0, n) * (df["SIT_ATIV"].to_numpy() == "AT")
+    sazon = 1 + 0.15 * np.sin(np.arange(12) / 12 * 2 * np.pi)
+    ene = base[:, None] * sazon[None, :] * rng.normal(1, 0.1, (n, 12)).clip(0.5)
+    fc = rng.uniform(0.3, 0.8, n)[:, None]  # fator de carga
+    dem = ene / (730 * fc)
+    mensal = {f"ENE_{m:02d}": ene[:, m - 1] for m in range(1, 13)}
+    if perfil["dem_pf"]:
+        mensal.update({f"DEM_P_{m:02d}": dem[:, m - 1] * 0.9 for m in range(1, 13)})
+        mensal.update({f"DEM_F_{m:02d}": dem[:, m - 1] for m in range(1, 13)})
+    else:
+        mensal.update({f"DEM_{m:02d}": dem[:, m - 1] for m in range(1, 13)})
+    mensal.update({f"DIC_{m:02d}": rng.exponential(1.5, n) for m in range(1, 13)})
+    mensal = pd.DataFrame(mensal).round(2)
+    # células vazias (dado faltante na origem)
+    mensal = mensal.mask(rng.random(mensal.shape) < PROP_NULOS)
+    fic = pd.DataFrame(rng.poisson(1.0, (n, 12)), columns=[f"FIC_{m:02d}" for m in range(1, 13)])
+    fic = fic.astype("Int64").mask(rng.random(fic.shape) < PROP_NULOS)
+    coords = pd.DataFrame({
+        "POINT_X": np.round(topo["lon"][ise] + rng.normal(0, 0.05, n), 6),
+        "POINT_Y": np.round(topo["lat"][ise] + rng.normal(0, 0.05, n), 6),
+        "DATA_BASE": rng.choice(np.array(BASES, dtype=object), n),
+    })
+    return pd.concat([df, mensal, fic, coords], axis=1)[colunas(tp)]
+
+
+def csv_bytes(df: pd.DataFrame) -> bytes:
+    """Bloco em CSV sem cabeçalho (';', vírgula decimal, nulo = vazio).
+    Com pyarrow a formatação roda em C++ (~10x mais rápida que o to_csv com decimal=','); o Arrow
+    só grava UTF-8, então o bloco é recodificado para ENCODING (nomes acentuados)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        from pyarrow import csv as pacsv
+    except ImportError:
+        return df.to_csv(sep=c3.SEP, decimal=c3.DECIMAL, index=False, header=False, na_rep="",
+                         lineterminator="\n").encode(c3.ENCODING)
+    tb = pa.Table.from_pandas(df, preserve_index=False)
+    cols = [pc.replace_substring(pc.cast(c, pa.string()), ".", c3.DECIMAL) if pa.types.is_floating(c.type) else c
+            for c in tb.columns]
+    buf = io.BytesIO()
+    pacsv.write_csv(pa.table(cols, names=tb.column_names), buf,
+                    pacsv.WriteOptions(include_header=False, delimiter=c3.SEP, quoting_style="none"))
+    return buf.getvalue().decode("utf-8").encode(c3.ENCODING)
+
+
+def grava_tipo(tp: str, destino: Path, linhas: int, rng: np.random.Generator, topo: dict):
+    """Grava o arquivo do tipo em blocos de BLOCO linhas (BT direto dentro do ZIP)."""
+    t0 = time.perf_counter()
+
+    def escreve(f):
+        f.write((c3.SEP.join(colunas(tp)) + "\n").encode(c3.ENCODING))
+        for ini in range(0, linhas, BLOCO):
+            df = bloco(tp, ini, min(BLOCO, linhas - ini), topo, rng)
+            f.write(csv_bytes(df))
+            print(f"   {tp}: {ini + len(df):>12,} / {linhas:,} linhas", end="\r")
+
+    if destino.suffix.lower() == ".zip":
+        with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED, compresslevel=ZIP_NIVEL) as z:
+            # force_zip64: o CSV do BT passa de 4 GB nas escalas maiores
+            with z.open(f"{destino.stem}.csv", "w", force_zip64=True) as f:
+                escreve(f)
+    else:
+        with open(destino, "wb") as f:
+            escreve(f)
+    dt = time.perf_counter() - t0
+    print(f"-> {destino.name}: {linhas:,} linhas, {destino.stat().st_size / 2**20:,.1f} MB em {dt:.1f}s"
+          + " " * 20)
+
+
+def gera(linhas: dict, diretorio: Path, semente: int = SEMENTE):
+    """Gera os três arquivos em diretorio com os nomes de Compara3PJ.FILES."""
+    diretorio.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(semente)
+    topo = topologia(rng)
+    for tp, n in linhas.items():
+        grava_tipo(tp, diretorio / c3.FILES[tp].name, n, rng, topo)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera extratos sintéticos de UC PJ (AT, MT, BT)")
+    for tp in ("at", "mt", "bt"):
+        parser.add_argument(f"--{tp}", type=int, default=LINHAS[tp], help=f"linhas de {tp.upper()}")
+    parser.add_argument("--dir", type=Path, default=c3.INPUT_DIR, help="destino (padrão: INPUT_DIR)")
+    parser.add_argument("--semente", type=int, default=SEMENTE)
+    args = parser.parse_args()
+
+    linhas = {tp: getattr(args, tp) for tp in ("at", "mt", "bt")}
+    for tp, n in linhas.items():
+        if not 0 <= n <= LINHAS_MAX:
+            print(f"[ERRO] --{tp} deve estar entre 0 e {LINHAS_MAX:,}")
+            sys.exit(1)
+    gera(linhas, args.dir, args.semente)
+    print(f"Arquivos gerados em {args.dir}")